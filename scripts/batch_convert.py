@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大量文本平行轉換
+以行程池將目錄樹、JSONL 或標準輸入中的簡體技術文本轉換為台灣用語；
+每個工作行程只載入一次二進位字典，大檔案分段讀取，輸出順序與輸入一致
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from corpus_cache import CACHE_NAME, CorpusCache, effective_terms, file_hash
+from term_converter import TERMS_FILE, TermConverter, select_leftmost_longest
+from term_dict import load_dictionary
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20        # 每段讀取的字元數
+JSONL_BATCH = 256           # JSONL 每個工作項目的行數
+
+_converter = None
+
+
+def _init_worker(terms_file, direction='cn2tw'):
+    """工作行程初始化：mmap 載入二進位字典，之後的工作項目共用"""
+    global _converter
+    # 不使用 load_converter 的快取，同一行程中 terms.csv 更新後也會載入新字典
+    _converter = TermConverter.from_dictionary(load_dictionary(terms_file, direction=direction))
+
+
+def _convert_text(text):
+    return _converter.convert(text)
+
+
+def _convert_lines(lines, field):
+    output = []
+    for line in lines:
+        if not line.strip():
+            output.append(line)
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            # 陣列、字串、數字等不是記錄的合法 JSON 原樣輸出
+            output.append(line)
+            continue
+        if isinstance(record.get(field), str):
+            record[field] = _converter.convert(record[field])
+        output.append(json.dumps(record, ensure_ascii=False) + '\n')
+    return ''.join(output)
+
+
+def iter_safe_chunks(stream, alphabet, chunk_size=CHUNK_SIZE, automaton=None):
+    """分段讀取文字串流，只在不屬於任何詞的字元之後切開，確保沒有比對會跨越兩段
+
+    指定 automaton 時，累積兩段仍找不到這種字元便改以 _forced_cut 切開，暫存的文字不超過三段；
+    未指定時會持續累積到出現安全切點為止
+    """
+    carry = ''
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+        buf = carry + block
+        cut = len(buf)
+        while cut > 0 and buf[cut - 1] in alphabet:
+            cut -= 1
+        if cut == 0 and automaton is not None and len(buf) >= 2 * chunk_size:
+            cut = _forced_cut(buf, automaton)
+        if cut == 0:
+            # 整段都可能屬於某個詞（極少見），繼續讀到出現安全切點為止
+            carry = buf
+            continue
+        carry = buf[cut:]
+        yield buf[:cut]
+    if carry:
+        yield carry
+
+
+def _forced_cut(buf, automaton):
+    """在找不到安全切點的 buf 中找出不改變轉換結果的切點，找不到時回傳 0
+
+    最左最長比對由左至右挑選，切點不落在選中的比對內部時，兩段分開轉換的結果與整段相同；
+    切點之後至少保留一個最長詞長，切點前每個起點的所有比對都已完整出現在 buf 中，不受之後的文字影響
+    """
+    limit = len(buf) - automaton.max_len
+    if limit <= 0:
+        return 0
+    for start, end, _ in select_leftmost_longest(automaton.longest_at(buf)):
+        if start >= limit:
+            break
+        if end > limit:
+            return start
+    return limit
+
+
+def ordered_map(executor, fn, iterable, window):
+    """依輸入順序產生結果，同時最多只有 window 個工作在途，以限制記憶體用量"""
+    pending = deque()
+    for args in iterable:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _SerialExecutor:
+    """jobs 為 1 時不建立行程池，直接在目前行程執行"""
+
+    def __init__(self, terms_file, direction='cn2tw'):
+        _init_worker(terms_file, direction)
+
+    def submit(self, fn, *args):
+        return _Done(fn(*args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Done:
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+class BatchConverter:
+    """平行轉換的進入點"""
+
+    def __init__(self, terms_file=TERMS_FILE, jobs=None, chunk_size=CHUNK_SIZE, direction='cn2tw'):
+        self.terms_file = terms_file
+        self.jobs = jobs or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.direction = direction
+        # 主行程先確保二進位字典為最新，避免工作行程同時重建
+        self.dictionary = load_dictionary(terms_file, direction=direction)
+        self.automaton = self.dictionary.automaton
+        self.alphabet = self.automaton.alphabet
+
+    def _executor(self):
+        if self.jobs == 1:
+            return _SerialExecutor(self.terms_file, self.direction)
+        return ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker,
+                                   initargs=(self.terms_file, self.direction))
+
+    @property
+    def window(self):
+        return self.jobs * 4
+
+    def convert_stream(self, src, dst):
+        """轉換文字串流"""
+        with self._executor() as executor:
+            chunks = ((chunk,) for chunk in iter_safe_chunks(src, self.alphabet, self.chunk_size, self.automaton))
+            for converted in ordered_map(executor, _convert_text, chunks, self.window):
+                dst.write(converted)
+
+    def convert_jsonl(self, src, dst, field='text'):
+        """轉換 JSONL 中每筆記錄的指定欄位"""
+        def batches():
+            lines = []
+            for line in src:
+                lines.append(line)
+                if len(lines) >= JSONL_BATCH:
+                    yield lines, field
+                    lines = []
+            if lines:
+                yield lines, field
+
+        with self._executor() as executor:
+            for converted in ordered_map(executor, _convert_lines, batches(), self.window):
+                dst.write(converted)
+
+    def _iter_file_chunks(self, path, strict=True):
+        """分段讀取檔案，只在不屬於任何詞的字元之後切開；strict 為 False 時遇到無法解碼的內容即停止"""
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                yield from iter_safe_chunks(f, self.alphabet, self.chunk_size, self.automaton)
+        except UnicodeDecodeError:
+            if strict:
+                raise
+
+    def convert_tree(self, src_dir, dst_dir, suffixes=None, cache_file=None):
+        """轉換目錄樹中的所有文字檔，輸出到 dst_dir 下相同的相對路徑，回傳轉換的檔案數
+
+        指定 cache_file 時為增量模式：只轉換內容變更、或用到的詞在字典更新中有變動的檔案（見 corpus_cache.py）。
+        無法以 UTF-8 解碼的檔案（例如圖片）原樣複製並記錄警告
+        """
+        files = []
+        for root, dirs, names in os.walk(src_dir):
+            dirs.sort()
+            for name in sorted(names):
+                if suffixes and not name.endswith(tuple(suffixes)):
+                    continue
+                files.append(os.path.join(root, name))
+        relpaths = [os.path.relpath(path, src_dir) for path in files]
+
+        selected = list(range(len(files)))
+        if cache_file:
+            cache = CorpusCache.load(cache_file, self.direction)
+            terms = effective_terms(self.dictionary)
+            needs_convert = cache.planner(self.dictionary.version, terms)
+            # 分塊計算雜湊，記憶體用量與檔案大小無關；hashlib 計算時會釋放 GIL，以執行緒同時處理多個檔案
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                digests = list(pool.map(file_hash, files))
+            documents = {}
+            selected = []
+            for index, path in enumerate(files):
+                relpath = relpaths[index]
+                digest = digests[index]
+                # 二進位檔只會原樣複製，不受字典影響，掃描到無法解碼處即可停止
+                need = needs_convert(relpath, digest, lambda: self._iter_file_chunks(path, strict=False))
+                if need or not os.path.exists(os.path.join(dst_dir, relpath)):
+                    selected.append(index)
+                    documents[relpath] = (digest, set())
+                else:
+                    documents[relpath] = (digest, cache.documents[relpath]['terms'])
+
+        def tasks():
+            # 所有檔案的分段依序送出，大檔與小檔都能分散到各個工作行程
+            for index in selected:
+                empty = True
+                try:
+                    for chunk in self._iter_file_chunks(files[index]):
+                        empty = False
+                        yield index, chunk
+                except UnicodeDecodeError:
+                    # 以 None 通知依序寫出的一端改為原樣複製，已寫出的部分會被覆蓋
+                    yield index, None
+                    continue
+                if empty:
+                    yield index, ''
+
+        current = None
+        out = None
+        with self._executor() as executor:
+            for index, converted, used in ordered_map(executor, _tagged_convert, tasks(), self.window):
+                if converted is None:
+                    if out and index == current:
+                        out.close()
+                        out = None
+                    current = None
+                    target = os.path.join(dst_dir, relpaths[index])
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(files[index], target)
+                    logger.warning(f"無法以 UTF-8 解碼，原樣複製：{relpaths[index]}")
+                    continue
+                if index != current:
+                    if out:
+                        out.close()
+                    current = index
+                    target = os.path.join(dst_dir, relpaths[index])
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    out = open(target, 'w', encoding='utf-8', newline='')
+                out.write(converted)
+                if cache_file:
+                    documents[relpaths[index]][1].update(used)
+        if out:
+            out.close()
+
+        if cache_file:
+            cache.update(self.dictionary.version, terms, documents)
+            cache.save()
+            logger.info(f"已轉換 {len(selected)} 個檔案到 {dst_dir}，略過 {len(files) - len(selected)} 個未受影響的檔案")
+        else:
+            logger.info(f"已轉換 {len(files)} 個檔案到 {dst_dir}")
+        return len(selected)
+
+
+def _tagged_convert(index, text):
+    if text is None:
+        return index, None, set()
+    converted, used = _converter.convert_with_keys(text)
+    return index, converted, used
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='以多個行程大量轉換技術文本。')
+    parser.add_argument('source', nargs='?', default='-', help='來源目錄或檔案，- 表示標準輸入')
+    parser.add_argument('--output', '-o', default=None, help='輸出目錄（來源為目錄時必填）或檔案，預設為標準輸出')
+    parser.add_argument('--terms', '-t', default=TERMS_FILE, help='術語對照表路徑')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='工作行程數，預設為 CPU 核心數')
+    parser.add_argument('--jsonl', action='store_true', help='輸入為 JSONL，轉換每筆記錄的 --field 欄位')
+    parser.add_argument('--field', default='text', help='JSONL 中要轉換的欄位')
+    parser.add_argument('--suffix', action='append', help='目錄模式只轉換這些副檔名，例如 --suffix .md')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='每段讀取的字元數')
+    parser.add_argument('--reverse', '-r', action='store_true', help='反向轉換：台灣用語 → 中國大陸用語')
+    parser.add_argument('--incremental', action='store_true',
+                        help='目錄模式只轉換內容或用到的詞有變更的檔案，轉換記錄存於輸出目錄的 ' + CACHE_NAME)
+    parser.add_argument('--cache', default=None, help='增量模式的轉換記錄路徑')
+    args = parser.parse_args()
+
+    batch = BatchConverter(args.terms, args.jobs, args.chunk_size, 'tw2cn' if args.reverse else 'cn2tw')
+
+    if os.path.isdir(args.source):
+        if not args.output:
+            parser.error('來源為目錄時必須指定 --output')
+        cache_file = None
+        if args.incremental or args.cache:
+            cache_file = args.cache or os.path.join(args.output, CACHE_NAME)
+        batch.convert_tree(args.source, args.output, args.suffix, cache_file)
+        return
+
+    src = sys.stdin if args.source == '-' else open(args.source, 'r', encoding='utf-8', newline='')
+    dst = sys.stdout if not args.output else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        if args.jsonl:
+            batch.convert_jsonl(src, dst, args.field)
+        else:
+            batch.convert_stream(src, dst)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+長文件分段與批次請求產生
+依段落、句子將文件切成符合 token 預算的片段，每段只附上自己用到的術語，
+以 JSONL 串流輸出可離線送出的批次請求；取得結果後依原順序合併回完整文件
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import sys
+
+from prompt_subset import load_subsetter
+from term_converter import TERMS_FILE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = 2000           # 每個請求的 prompt（說明、術語表與文本）token 預算
+MAX_OUTPUT_TOKENS = 4096    # Anthropic 格式必填的輸出上限
+FORMATS = ('openai', 'anthropic')
+
+CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]')
+PARAGRAPH_END = re.compile(r'\n[ \t]*\n\s*')
+SENTENCE_END = re.compile(r'[。！？；!?]+[」』”’）)]*\s*|[.;](?=\s)\s*')
+ID_UNSAFE = re.compile(r'[^A-Za-z0-9_-]+')
+
+
+def estimate_tokens(text):
+    """粗估 token 數：中日韓字元與全形標點各算 1 個，其餘非空白字元約 4 個算 1 個"""
+    cjk = len(CJK_PATTERN.findall(text))
+    other = sum(1 for ch in text if not ch.isspace()) - cjk
+    return cjk + math.ceil(max(other, 0) / 4)
+
+
+def _split_after(text, pattern):
+    """在每個 pattern 比對結束處切開，各段串接後與原文相同"""
+    pieces = []
+    pos = 0
+    for m in pattern.finditer(text):
+        if m.end() > pos:
+            pieces.append(text[pos:m.end()])
+            pos = m.end()
+    if pos < len(text):
+        pieces.append(text[pos:])
+    return pieces
+
+
+def _hard_split(text, max_tokens, alphabet):
+    """句子仍超過預算時依字元數切開，盡量不切在術語字元之間"""
+    start = 0
+    while start < len(text):
+        cut = min(start + max_tokens, len(text))
+        if cut < len(text):
+            safe = cut
+            while safe > start and text[safe - 1] in alphabet and text[safe] in alphabet:
+                safe -= 1
+            if safe > start:
+                cut = safe
+        yield text[start:cut]
+        start = cut
+
+
+def _iter_units(text, max_tokens, alphabet):
+    for paragraph in _split_after(text, PARAGRAPH_END):
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in _split_after(paragraph, SENTENCE_END):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+            else:
+                yield from _hard_split(sentence, max_tokens, alphabet)
+
+
+def split_text(text, max_tokens=MAX_TOKENS, alphabet=frozenset()):
+    """將文本切成每段不超過 max_tokens 的片段，優先在段落、其次在句子邊界切開"""
+    chunk = []
+    used = 0
+    for unit in _iter_units(text, max_tokens, alphabet):
+        cost = estimate_tokens(unit)
+        if chunk and used + cost > max_tokens:
+            yield ''.join(chunk)
+            chunk = []
+            used = 0
+        chunk.append(unit)
+        used += cost
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _strip_whitespace(chunk):
+    """拆出前後空白，只送出內容，合併時再補回，避免模型改動段落間距"""
+    body = chunk.strip()
+    if not body:
+        return chunk, '', ''
+    start = chunk.index(body)
+    return chunk[:start], body, chunk[start + len(body):]
+
+
+def make_request(custom_id, prompt, model, fmt='openai', max_output_tokens=MAX_OUTPUT_TOKENS):
+    """產生一筆批次請求"""
+    messages = [{'role': 'user', 'content': prompt}]
+    if fmt == 'anthropic':
+        return {'custom_id': custom_id,
+                'params': {'model': model, 'max_tokens': max_output_tokens, 'messages': messages}}
+    return {'custom_id': custom_id, 'method': 'POST', 'url': '/v1/chat/completions',
+            'body': {'model': model, 'messages': messages}}
+
+
+def response_text(record):
+    """取出批次結果中的回應文字，支援 OpenAI 與 Anthropic 的結果格式，失敗時回傳 None"""
+    if 'result' in record:
+        result = record['result']
+        if result.get('type') != 'succeeded':
+            return None
+        return ''.join(block.get('text', '') for block in result['message']['content'])
+    response = record.get('response') or {}
+    if response.get('status_code', 200) != 200:
+        return None
+    return response['body']['choices'][0]['message']['content']
+
+
+class BatchRequestBuilder:
+    """將文件切段並產生批次請求，同時累積合併所需的對照表"""
+
+    def __init__(self, terms_file=TERMS_FILE, model=None, fmt='openai', max_tokens=MAX_TOKENS,
+                 max_output_tokens=MAX_OUTPUT_TOKENS, full=False):
+        if fmt not in FORMATS:
+            raise ValueError(f'不支援的格式: {fmt}')
+        self.subsetter = load_subsetter(terms_file)
+        self.model = model
+        self.fmt = fmt
+        self.max_tokens = max_tokens
+        self.max_output_tokens = max_output_tokens
+        self.full = full
+        self.documents = []
+
+    def iter_requests(self, name, text):
+        """產生一份文件的所有請求，custom_id 依文件與片段編號排序"""
+        doc_id = f"d{len(self.documents):05d}-{ID_UNSAFE.sub('_', name)[-40:]}"
+        chunks = []
+        self.documents.append({'name': name, 'chunks': chunks})
+        # 說明與術語表也計入預算：先扣除固定的說明（full 時含完整術語表），片段用到的術語使 prompt 超出時再切小
+        overhead = estimate_tokens(self.subsetter.build_prompt('', self.full))
+        for index, (chunk, prompt) in enumerate(self._fit_chunks(text, self.max_tokens - overhead)):
+            prefix, body, suffix = _strip_whitespace(chunk)
+            custom_id = f"{doc_id}-{index:05d}"
+            chunks.append({'id': custom_id if body else None, 'prefix': prefix, 'suffix': suffix})
+            if body:
+                yield make_request(custom_id, prompt, self.model, self.fmt, self.max_output_tokens)
+
+    def _fit_chunks(self, text, budget):
+        """產生 (片段, prompt)，每個 prompt 的估計 token 數不超過 max_tokens；空白片段的 prompt 為 None"""
+        if budget <= 0:
+            raise ValueError(f'token 預算 {self.max_tokens} 不足以容納 prompt 的說明與術語表')
+        for chunk in split_text(text, budget, self.subsetter.automaton.alphabet):
+            body = chunk.strip()
+            if not body:
+                yield chunk, None
+                continue
+            prompt = self.subsetter.build_prompt(body, self.full)
+            excess = estimate_tokens(prompt) - self.max_tokens
+            if excess > 0:
+                yield from self._fit_chunks(chunk, budget - excess)
+            else:
+                yield chunk, prompt
+
+    def write(self, sources, dst):
+        """以 JSONL 串流寫出所有 (name, text) 的請求，回傳請求數"""
+        count = 0
+        for name, text in sources:
+            for request in self.iter_requests(name, text):
+                dst.write(json.dumps(request, ensure_ascii=False) + '\n')
+                count += 1
+        return count
+
+    def manifest(self):
+        return {'format': self.fmt, 'documents': self.documents}
+
+
+def merge_results(manifest, results):
+    """依對照表將批次結果合併回各文件，回傳 {name: text}；結果不完整或文件名稱重複時丟出 RuntimeError"""
+    texts = {}
+    for line in results:
+        if line.strip():
+            record = json.loads(line)
+            texts[record['custom_id']] = response_text(record)
+    merged = {}
+    missing = []
+    for document in manifest['documents']:
+        if document['name'] in merged:
+            raise RuntimeError(f"對照表中有重複的文件名稱: {document['name']}")
+        pieces = []
+        for chunk in document['chunks']:
+            body = ''
+            if chunk['id'] is not None:
+                body = texts.get(chunk['id'])
+                if body is None:
+                    missing.append(chunk['id'])
+                    continue
+            pieces.append(chunk['prefix'] + body.strip() + chunk['suffix'])
+        merged[document['name']] = ''.join(pieces)
+    if missing:
+        raise RuntimeError(f"缺少 {len(missing)} 個片段的結果: {', '.join(missing[:5])}")
+    return merged
+
+
+def iter_sources(paths, suffixes=None):
+    """讀取來源檔案或目錄，產生 (相對名稱, 內容)
+
+    名稱為相對於所有來源共同上層目錄的路徑：單一目錄時即為目錄內的相對路徑、單一檔案時為檔名，
+    不同目錄中同名的檔案不會互相覆蓋；同一個檔案只產生一次
+    """
+    roots = [os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path) or '.') for path in paths]
+    base = os.path.commonpath(roots) if roots else '.'
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files = []
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names)
+                             if not suffixes or name.endswith(tuple(suffixes)))
+        else:
+            files = [path]
+        for full_path in files:
+            name = os.path.relpath(os.path.abspath(full_path), base)
+            if name in seen:
+                continue
+            seen.add(name)
+            with open(full_path, encoding='utf-8', newline='') as f:
+                yield name, f.read()
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='將長文件切段並產生 JSONL 批次請求，或合併批次結果。')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='產生批次請求')
+    build.add_argument('sources', nargs='+', help='來源檔案或目錄')
+    build.add_argument('--output', '-o', required=True, help='輸出的 JSONL 檔，對照表寫在同名的 .manifest.json')
+    build.add_argument('--model', '-m', required=True, help='模型名稱')
+    build.add_argument('--format', choices=FORMATS, default='openai', help='批次請求格式')
+    build.add_argument('--max-tokens', type=int, default=MAX_TOKENS,
+                       help='每個請求 prompt 的 token 預算，包含說明、術語表與文本')
+    build.add_argument('--max-output-tokens', type=int, default=MAX_OUTPUT_TOKENS, help='Anthropic 格式的輸出上限')
+    build.add_argument('--terms', '-t', default=TERMS_FILE, help='術語對照表路徑')
+    build.add_argument('--suffix', action='append', help='目錄中只處理這些副檔名')
+    build.add_argument('--full', action='store_true', help='每段都附上完整術語表')
+
+    merge = sub.add_parser('merge', help='依原順序合併批次結果')
+    merge.add_argument('results', help='批次結果 JSONL')
+    merge.add_argument('--manifest', required=True, help='build 產生的對照表')
+    merge.add_argument('--output', '-o', required=True, help='輸出目錄')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        builder = BatchRequestBuilder(args.terms, args.model, args.format, args.max_tokens,
+                                      args.max_output_tokens, args.full)
+        with open(args.output, 'w', encoding='utf-8') as dst:
+            try:
+                count = builder.write(iter_sources(args.sources, args.suffix), dst)
+            except ValueError as e:
+                logger.error(str(e))
+                sys.exit(1)
+        manifest_file = os.path.splitext(args.output)[0] + '.manifest.json'
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(builder.manifest(), f, ensure_ascii=False, indent=1)
+        logger.info(f"{len(builder.documents)} 份文件共產生 {count} 個請求到 {args.output}，對照表 {manifest_file}")
+        return
+
+    with open(args.manifest, encoding='utf-8') as f:
+        manifest = json.load(f)
+    with open(args.results, encoding='utf-8') as f:
+        try:
+            merged = merge_results(manifest, f)
+        except RuntimeError as e:
+            logger.error(str(e))
+            sys.exit(1)
+    for name, text in merged.items():
+        target = os.path.join(args.output, name)
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        with open(target, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+    logger.info(f"已合併 {len(merged)} 份文件到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+離線效能基準測試
+以錄製的維基教科書頁面與放大 1×、10×、100×、1000× 的合成術語表，量測爬蟲解析、合併、儲存、
+README 產生與 modify_term 的執行時間及記憶體峰值，輸出 JSON 並與儲存的基準比較，退步時回傳非零結束碼
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from modify_term import modify_term
+from scrape_wiki_terms import WikiTermsScraper
+from term_converter import load_terms
+from term_store import write_terms_csv
+from testutil import working_directory
+from update_terms import BLOCK_END, BLOCK_START, traditional_converter, update_readme
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TERMS_FILE = os.path.join(ROOT, 'terms.csv')
+FIXTURE_FILE = os.path.join(ROOT, 'scripts', 'fixtures', 'wiki_terms_page.html')
+RESULTS_FILE = os.path.join(ROOT, 'benchmarks', 'results.json')
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+SCALES = (1, 10, 100, 1000)
+REPEAT = 3
+TOLERANCE = 0.25          # 比基準慢或多用超過 25% 視為退步
+MIN_SECONDS_DELTA = 0.005  # 差距小於此值視為量測雜訊
+MIN_KIB_DELTA = 64
+CHANGE_EVERY = 20          # 合成的維基內容每 20 個詞變更一個
+
+
+def scaled_terms(scale, base=None):
+    """將目前的術語表放大 scale 倍：第 j 份複本的詞加上由 j 編碼的漢字字尾，確保不重複"""
+    base = base if base is not None else load_terms(TERMS_FILE)
+    terms = {}
+    for j in range(scale):
+        suffix = ''
+        n = j
+        while n:
+            n, digit = divmod(n, 256)
+            suffix += chr(0x4E00 + digit)
+        for cn, tw in base.items():
+            terms[cn + suffix] = ';'.join(t + suffix for t in tw.split(';'))
+    return terms
+
+
+def changed_wiki_terms(terms):
+    """模擬一次維基更新：部分詞換成新的台灣用語，回傳爬蟲解析後的 [(cn, tw), ...] 格式"""
+    wiki_terms = []
+    for index, (cn, tw) in enumerate(terms.items()):
+        alternatives = tw.split(';')
+        if index % CHANGE_EVERY == 0:
+            alternatives = alternatives[:1] + [alternatives[0] + '新']
+        wiki_terms.extend((cn, t) for t in alternatives)
+    return wiki_terms
+
+
+def synthetic_page(terms):
+    """以錄製頁面為外框，將第一個術語表格換成合成術語"""
+    with open(FIXTURE_FILE, encoding='utf-8') as f:
+        page = f.read()
+    start = page.index('<table class="wikitable')
+    end = page.index('</table>', start) + len('</table>')
+    rows = ''.join(f'<tr>\n<td>term{i}</td>\n<td>{tw}</td>\n<td>{cn}</td>\n</tr>\n'
+                   for i, (cn, tw) in enumerate(terms.items()))
+    table = ('<table class="wikitable sortable">\n<tbody><tr>\n<th>英文</th>\n<th>台灣</th>\n'
+             '<th>中國大陸</th>\n</tr>\n' + rows + '</tbody></table>')
+    return page[:start] + table + page[end:]
+
+
+class Workload:
+    """一個放大倍數下各項基準共用的輸入資料與暫存目錄"""
+
+    def __init__(self, scale, base=None):
+        self.scale = scale
+        self.terms = scaled_terms(scale, base)
+        self.wiki_terms = changed_wiki_terms(self.terms)
+        self.tmpdir = tempfile.mkdtemp(prefix=f'bench{scale}x.')
+        self.page = None
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def reset(self):
+        """每次量測前重建術語檔案，確保每次執行的輸入相同"""
+        for name in os.listdir(self.tmpdir):
+            os.remove(self.path(name))
+        write_terms_csv(self.path('terms.csv'), self.terms)
+        write_terms_csv(self.path('wiki_terms_snapshot.csv'), self.terms)
+        with open(self.path('deleted_terms.txt'), 'w', encoding='utf-8') as f:
+            f.write(''.join(f'{cn},{tw.split(";")[0]}\n' for cn, tw in list(self.terms.items())[::50]))
+        with open(self.path('README.md'), 'w', encoding='utf-8') as f:
+            f.write(f'# 術語\n\n```\n{BLOCK_START}\n{BLOCK_END}\n```\n')
+
+    def scraper(self):
+        scraper = WikiTermsScraper()
+        scraper.terms_file = self.path('terms.csv')
+        scraper.wiki_snapshot_file = self.path('wiki_terms_snapshot.csv')
+        scraper.deleted_terms_file = self.path('deleted_terms.txt')
+        scraper.history_file = self.path('terms_history.sqlite')
+        return scraper
+
+    def close(self):
+        shutil.rmtree(self.tmpdir)
+
+
+def bench_parse_terms_table(work):
+    if work.page is None:
+        work.page = synthetic_page(work.terms)
+    scraper = work.scraper()
+    return lambda: scraper.parse_terms_table(work.page)
+
+
+def bench_merge_terms(work):
+    scraper = work.scraper()
+    # 載入三個術語檔案屬於準備步驟，只量測合併本身
+    existing_terms = scraper.load_existing_terms()
+    return lambda: scraper.merge_terms(work.wiki_terms, existing_terms)
+
+
+def bench_save_terms(work):
+    scraper = work.scraper()
+    merged = dict(work.terms)
+    for cn, tw in work.wiki_terms[::CHANGE_EVERY]:
+        merged[cn] = tw
+    return lambda: scraper.save_terms(merged)
+
+
+def bench_update_readme(work):
+    return lambda: update_readme(work.path('terms.csv'), work.path('README.md'))
+
+
+def bench_update_readme_incremental(work):
+    cache_file = work.path('readme_cache.json')
+    update_readme(work.path('terms.csv'), work.path('README.md'), cache_file)
+    rows = dict(work.terms)
+    for cn in list(rows)[::CHANGE_EVERY]:
+        rows[cn] += ';新'
+    write_terms_csv(work.path('terms.csv'), rows)
+    return lambda: update_readme(work.path('terms.csv'), work.path('README.md'), cache_file)
+
+
+def bench_modify_term(work):
+    cn = next(iter(work.terms))
+
+    def run():
+        with working_directory(work.tmpdir):
+            modify_term(cn, None, delete_mode=True)
+    return run
+
+
+BENCHMARKS = {
+    'parse_terms_table': bench_parse_terms_table,
+    'merge_terms': bench_merge_terms,
+    'save_terms': bench_save_terms,
+    'update_readme': bench_update_readme,
+    'update_readme_incremental': bench_update_readme_incremental,
+    'modify_term': bench_modify_term,
+}
+
+
+def measure(work, prepare, repeat=REPEAT):
+    """量測 repeat 次取中位數，另以 tracemalloc 跑一次取得記憶體峰值（tracemalloc 會拖慢執行，不計入時間）"""
+    times = []
+    for _ in range(repeat):
+        work.reset()
+        run = prepare(work)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    work.reset()
+    run = prepare(work)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(statistics.median(times), 6), 'min_seconds': round(min(times), 6),
+            'peak_kib': round(peak / 1024, 1), 'rows': len(work.terms)}
+
+
+def run_suite(scales=SCALES, names=None, repeat=REPEAT):
+    """執行所有基準，回傳 {'meta': ..., 'results': {'名稱@倍數x': 量測結果}}"""
+    names = names or list(BENCHMARKS)
+    base = load_terms(TERMS_FILE)
+    traditional_converter()  # 轉換表只建立一次，不計入 README 產生的時間
+    results = {}
+    for scale in scales:
+        work = Workload(scale, base)
+        try:
+            for name in names:
+                key = f'{name}@{scale}x'
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[key] = measure(work, BENCHMARKS[name], repeat)
+                print(f"{key:<36} {results[key]['seconds']:>10.4f} s {results[key]['peak_kib']:>12.1f} KiB",
+                      file=sys.stderr)
+        finally:
+            work.close()
+    meta = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'base_rows': len(base),
+        'repeat': repeat,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """與基準比較，回傳退步項目的說明列表；只比較兩邊都有的項目"""
+    regressions = []
+    for key, current in results['results'].items():
+        previous = baseline.get('results', {}).get(key)
+        if previous is None:
+            continue
+        seconds, base_seconds = current['seconds'], previous['seconds']
+        if seconds > base_seconds * (1 + tolerance) and seconds - base_seconds > MIN_SECONDS_DELTA:
+            regressions.append(f"{key} 時間 {base_seconds:.4f}s → {seconds:.4f}s")
+        peak, base_peak = current['peak_kib'], previous['peak_kib']
+        if peak > base_peak * (1 + tolerance) and peak - base_peak > MIN_KIB_DELTA:
+            regressions.append(f"{key} 記憶體 {base_peak:.1f}KiB → {peak:.1f}KiB")
+    return regressions
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='離線執行效能基準測試並與基準比較。')
+    parser.add_argument('--scales', default=','.join(map(str, SCALES)), help='術語表放大倍數，以逗號分隔')
+    parser.add_argument('--only', action='append', choices=list(BENCHMARKS), help='只執行指定的基準')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='每項量測次數（取中位數）')
+    parser.add_argument('--output', '-o', default=RESULTS_FILE, help='結果 JSON 路徑')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='比較用的基準 JSON')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='允許的退步比例')
+    parser.add_argument('--update-baseline', action='store_true', help='以這次結果取代基準')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # 合併過程的逐詞記錄不輸出，避免終端機 I/O 影響量測
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    results = run_suite(scales, args.only, args.repeat)
+    write_json(args.output, results)
+    print(f"結果已寫入 {args.output}")
+
+    if args.update_baseline:
+        write_json(args.baseline, results)
+        print(f"基準已更新：{args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"找不到基準 {args.baseline}，略過比較（可用 --update-baseline 建立）")
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"效能退步（容許 {args.tolerance:.0%}）：")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("與基準相比沒有退步")
+
+
+if __name__ == '__main__':
+    main()
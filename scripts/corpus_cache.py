@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件庫增量轉換快取
+記錄每份文件的內容雜湊與轉換時實際替換過的詞，以及轉換時使用的字典版本與對應；
+字典更新後比對新舊對應（與 merge_terms 比對 wiki_terms_snapshot.csv 的方式相同），
+只重新轉換內容變更、用到對應有變更或刪除的詞，或含有新增詞的文件
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from term_converter import AhoCorasick, split_alternatives
+from term_store import atomic_open
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = '.tw_terms_cache.json'
+CACHE_FORMAT = 1
+HASH_BLOCK = 1 << 20     # 計算雜湊時每次讀取的位元組數
+
+
+def file_hash(path, block_size=HASH_BLOCK):
+    """分塊計算檔案內容的 SHA-256，不需將整個檔案載入記憶體"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def effective_terms(dictionary):
+    """字典中每個來源詞實際替換成的文字（第一個候選詞）；只有這個值影響轉換結果"""
+    return {source: split_alternatives(raw)[0] for source, raw in dictionary.items()}
+
+
+def diff_terms(old, new):
+    """比較新舊對應，回傳 (新增的詞, 對應變更或刪除的詞)"""
+    added = {source for source in new if source not in old}
+    changed = {source for source, target in old.items() if new.get(source) != target}
+    return added, changed
+
+
+class CorpusCache:
+    """一個輸出目錄的轉換記錄"""
+
+    def __init__(self, path, direction='cn2tw'):
+        self.path = path
+        self.direction = direction
+        self.dictionary = None  # 上次轉換的字典版本
+        self.terms = {}         # 上次轉換的 來源詞 → 替換文字
+        self.documents = {}     # 相對路徑 → {'hash': 內容雜湊, 'terms': [替換過的來源詞]}
+
+    @classmethod
+    def load(cls, path, direction='cn2tw'):
+        """載入快取；不存在、格式不符或轉換方向不同時回傳空的快取，所有文件都會重新轉換"""
+        cache = cls(path, direction)
+        if not os.path.exists(path):
+            return cache
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"轉換快取無法讀取，全部重新轉換: {e}")
+            return cache
+        if data.get('format') != CACHE_FORMAT or data.get('direction') != direction:
+            return cache
+        cache.dictionary = data.get('dictionary')
+        cache.terms = data.get('terms', {})
+        cache.documents = data.get('documents', {})
+        return cache
+
+    def save(self):
+        data = {
+            'format': CACHE_FORMAT,
+            'direction': self.direction,
+            'dictionary': self.dictionary,
+            'terms': self.terms,
+            'documents': self.documents,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with atomic_open(self.path) as f:
+            json.dump(data, f, ensure_ascii=False, sort_keys=True)
+
+    def planner(self, dictionary_version, terms):
+        """回傳判斷文件是否需要重新轉換的函式 (relpath, digest, iter_text) -> bool
+
+        digest 為目前的內容雜湊；iter_text 為產生文件文字分段的函式，分段只能切在不屬於任何詞的字元之後，
+        只有需要掃描新增的詞時才會呼叫，且找到第一個新增詞即停止讀取。
+        字典版本相同時只看內容雜湊；不同時比對新舊對應，文件用過的詞有變更、或文件中出現新增的詞才需要重新轉換
+        """
+        if self.dictionary is None or dictionary_version == self.dictionary:
+            # 沒有快取時每份文件都沒有記錄，本來就全部轉換
+            added, changed = set(), set()
+        else:
+            added, changed = diff_terms(self.terms, terms)
+            logger.info(f"字典已更新：新增 {len(added)} 個詞，變更或刪除 {len(changed)} 個詞")
+        # 新增的詞可能讓原本的比對改以更長或更早開始的詞取代，只能掃描文件內容判斷
+        added_automaton = AhoCorasick(sorted(added)) if added else None
+
+        def needs_convert(relpath, digest, iter_text):
+            entry = self.documents.get(relpath)
+            if entry is None or entry['hash'] != digest:
+                return True
+            if changed and not changed.isdisjoint(entry['terms']):
+                return True
+            if added_automaton is not None:
+                return any(added_automaton.matched_keys(chunk) for chunk in iter_text())
+            return False
+
+        return needs_convert
+
+    def update(self, dictionary_version, terms, documents):
+        """以這次轉換的結果更新快取；documents 為 {相對路徑: (內容雜湊, 替換過的來源詞)}，未列出的舊文件會被移除"""
+        self.dictionary = dictionary_version
+        self.terms = terms
+        self.documents = {
+            relpath: {'hash': digest, 'terms': sorted(used)} for relpath, (digest, used) in documents.items()
+        }
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批次簡體轉繁體
+將 HanziConv 的字元對照一次載入為 str.translate 對照表，整欄文字以單次 translate 完成轉換；
+不需轉換的字詞以詞組覆寫處理，不再用佔位符號來回替換
+"""
+
+from term_converter import AhoCorasick, select_leftmost_longest
+
+# 批次轉換時用來串接多筆文字的分隔字元，不在 HanziConv 的對照表中
+SEPARATOR = '\n'
+
+
+def build_table():
+    """由 HanziConv 的字元對照建立 str.translate 對照表，與 HanziConv 相同取第一個對應"""
+    from hanziconv.charmap import simplified_charmap, traditional_charmap
+
+    table = {}
+    for simplified, traditional in zip(simplified_charmap, traditional_charmap):
+        table.setdefault(ord(simplified), traditional)
+    return {cp: ch for cp, ch in table.items() if chr(cp) != ch}
+
+
+class TraditionalConverter:
+    """以 str.translate 批次轉繁體，overrides 為 {詞組: 輸出} 的覆寫，優先於逐字轉換"""
+
+    def __init__(self, overrides=None, table=None):
+        self.table = dict(table if table is not None else build_table())
+        self.phrases = {}
+        for phrase, replacement in (overrides or {}).items():
+            if len(phrase) == 1 and len(replacement) == 1:
+                # 單字覆寫直接併入對照表
+                if phrase == replacement:
+                    self.table.pop(ord(phrase), None)
+                else:
+                    self.table[ord(phrase)] = replacement
+            elif phrase:
+                self.phrases[phrase] = replacement
+        self.phrase_keys = sorted(self.phrases)
+        self.automaton = AhoCorasick(self.phrase_keys) if self.phrases else None
+
+    def convert(self, text):
+        """轉換單筆文字；詞組覆寫以最左最長比對決定，其餘部分以 translate 轉換"""
+        if self.automaton is None:
+            return text.translate(self.table)
+        matches = select_leftmost_longest(self.automaton.longest_at(text))
+        if not matches:
+            return text.translate(self.table)
+        pieces = []
+        pos = 0
+        for start, end, index in matches:
+            pieces.append(text[pos:start].translate(self.table))
+            pieces.append(self.phrases[self.phrase_keys[index]])
+            pos = end
+        pieces.append(text[pos:].translate(self.table))
+        return ''.join(pieces)
+
+    def convert_many(self, texts):
+        """以單次轉換處理整欄文字，回傳與輸入同順序的 list"""
+        texts = list(texts)
+        if any(SEPARATOR in text for text in texts):
+            return [self.convert(text) for text in texts]
+        converted = self.convert(SEPARATOR.join(texts)).split(SEPARATOR)
+        if len(converted) != len(texts):
+            # 覆寫的輸出含有分隔字元時，改為逐筆轉換
+            return [self.convert(text) for text in texts]
+        return converted
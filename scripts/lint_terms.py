@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+術語表檢查
+找出重複的 cn 列、重複或空白的候選詞、自我對應、互相包含的詞、會被再次替換的轉換結果，
+以及與 deleted_terms.txt 衝突的對應；以雜湊索引與 Aho-Corasick 自動機檢查，不做兩兩比較
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import namedtuple
+
+from term_converter import TERMS_FILE, AhoCorasick
+from term_store import DELETED_TERMS_FILE
+
+# check 為檢查項目，severity 為 error 或 warning，detail 為說明
+Issue = namedtuple('Issue', ['check', 'severity', 'cn', 'detail'])
+
+CHECKS = {
+    'duplicate_key': 'error',            # 同一個 cn 出現在多列
+    'empty_value': 'error',              # cn 或 tw 為空
+    'deleted_conflict': 'error',         # 對應已記錄在 deleted_terms.txt 卻仍在術語表中
+    'duplicate_alternative': 'warning',  # 同一列的候選詞重複
+    'empty_alternative': 'warning',      # 候選詞之間有空白項目（例如 ;;）
+    'self_mapping': 'warning',           # 候選詞與 cn 或其繁體寫法相同
+    'nested_key': 'warning',             # cn 包含其他 cn，以子字串替換時結果取決於比對順序
+    'unsafe_target': 'warning',          # 轉換結果中含有其他 cn，重複轉換會再被替換
+}
+
+
+def read_rows(terms_file=TERMS_FILE):
+    """以原始列讀取 terms.csv，保留重複的 cn"""
+    with open(terms_file, 'r', encoding='utf-8') as f:
+        return [(row['cn'], row['tw']) for row in csv.DictReader(f)]
+
+
+def _issue(check, cn, detail):
+    return Issue(check, CHECKS[check], cn, detail)
+
+
+def lint_terms(rows, deleted=None, traditional=None):
+    """檢查 [(cn, tw), ...]，回傳 Issue 列表
+
+    deleted 為 {cn: set(tw)} 的刪除索引；traditional 為 cn → 繁體寫法的函式，用於找出轉繁體後的自我對應
+    """
+    issues = []
+    deleted = deleted or {}
+    terms = {}
+    for cn, tw in rows:
+        if cn in terms:
+            issues.append(_issue('duplicate_key', cn, f'重複的列：{terms[cn]} / {tw}'))
+            continue
+        terms[cn] = tw
+        if not cn.strip() or not tw.strip():
+            issues.append(_issue('empty_value', cn, f'空白的對應：{cn!r},{tw!r}'))
+
+    keys = [cn for cn in terms if cn]
+    trads = dict(zip(keys, traditional(keys))) if traditional else {}
+    alternatives = {}
+    for cn in keys:
+        parts = [t.strip() for t in terms[cn].split(';')]
+        if '' in parts and len(parts) > 1:
+            issues.append(_issue('empty_alternative', cn, f'候選詞中有空白項目：{terms[cn]}'))
+        seen = set()
+        for tw in parts:
+            if tw in seen:
+                issues.append(_issue('duplicate_alternative', cn, f'重複的候選詞：{tw}'))
+            seen.add(tw)
+        alternatives[cn] = [tw for tw in dict.fromkeys(parts) if tw]
+        for tw in alternatives[cn]:
+            if tw == cn or tw == trads.get(cn):
+                issues.append(_issue('self_mapping', cn, f'對應到自身：{tw}'))
+            if tw in deleted.get(cn, ()):
+                issues.append(_issue('deleted_conflict', cn, f'{cn},{tw} 已記錄在刪除詞彙中'))
+
+    # 所有 cn 建一個自動機，每個詞與候選詞只掃描一次，成本與總長度及比對數成正比
+    automaton = AhoCorasick(keys)
+    for cn in keys:
+        inner = sorted({keys[index] for _, _, index in automaton.iter_matches(cn)} - {cn})
+        for other in inner:
+            kind = '開頭' if cn.startswith(other) else '中間'
+            issues.append(_issue('nested_key', cn, f'{kind}包含 {other}'))
+        for tw in alternatives[cn]:
+            found = sorted({keys[index] for _, _, index in automaton.iter_matches(tw)})
+            # 轉換結果中含有 cn 本身（例如 位 → 位元）時重複轉換會變成 位元元；對應到自己的詞則無害
+            found = [other for other in found if other not in alternatives.get(other, ())]
+            if found:
+                issues.append(_issue('unsafe_target', cn, f'轉換結果 {tw} 含有 {"、".join(found)}'))
+    return issues
+
+
+def lint_files(terms_file=TERMS_FILE, deleted_file=DELETED_TERMS_FILE, traditional=True):
+    """檢查術語檔案；traditional 為 True 時以 HanziConv 找出轉繁體後的自我對應"""
+    rows = read_rows(terms_file)
+    return lint_terms(rows, load_deleted(deleted_file), traditional_function() if traditional else None)
+
+
+def load_deleted(deleted_file=DELETED_TERMS_FILE):
+    """讀取 deleted_terms.txt 為 {cn: set(tw)}"""
+    deleted = {}
+    if os.path.exists(deleted_file):
+        with open(deleted_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if ',' in line:
+                    cn, tws = line.split(',', 1)
+                    deleted.setdefault(cn.strip(), set()).update(t.strip() for t in tws.split(';') if t.strip())
+    return deleted
+
+
+def traditional_function():
+    """回傳批次轉繁體的函式"""
+    from update_terms import traditional_converter
+    return traditional_converter().convert_many
+
+
+def summarize(issues):
+    """回傳 {check: 數量}，依 CHECKS 的順序"""
+    counts = {}
+    for check in CHECKS:
+        n = sum(1 for issue in issues if issue.check == check)
+        if n:
+            counts[check] = n
+    return counts
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='檢查術語表中的重複、重疊與衝突。')
+    parser.add_argument('--terms', '-t', default=TERMS_FILE, help='術語對照表路徑')
+    parser.add_argument('--deleted', default=DELETED_TERMS_FILE, help='刪除詞彙記錄檔路徑')
+    parser.add_argument('--check', action='append', choices=list(CHECKS), help='只輸出指定的檢查項目')
+    parser.add_argument('--json', action='store_true', help='以 JSON Lines 輸出')
+    parser.add_argument('--summary', action='store_true', help='只輸出各檢查項目的數量')
+    parser.add_argument('--strict', action='store_true', help='有警告時也以非零結束碼結束')
+    args = parser.parse_args()
+
+    issues = lint_files(args.terms, args.deleted)
+    if args.check:
+        issues = [issue for issue in issues if issue.check in args.check]
+    if not args.summary:
+        for issue in issues:
+            if args.json:
+                print(json.dumps(issue._asdict(), ensure_ascii=False))
+            else:
+                print(f"[{issue.severity}] {issue.check} {issue.cn}: {issue.detail}")
+    counts = summarize(issues)
+    errors = sum(1 for issue in issues if issue.severity == 'error')
+    warnings = len(issues) - errors
+    detail = '，'.join(f'{check} {n}' for check, n in counts.items())
+    print(f"錯誤 {errors} 個，警告 {warnings} 個" + (f"（{detail}）" if detail else ''), file=sys.stderr)
+    if errors or (args.strict and warnings):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
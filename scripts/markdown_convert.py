@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown 感知的術語轉換
+以單一正規表示式掃描文件，將每個區段分類為內文、圍欄程式碼、行內程式碼、連結目標、網址或 HTML 標籤與註解，
+自動機只掃描內文區段，程式碼、識別字與網址保持原樣；可輸出以 UTF-8 位元組位置表示的對應表供 source map 使用
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import namedtuple
+
+from term_converter import TERMS_FILE, load_converter
+
+PROSE = 'prose'
+FENCED_CODE = 'fenced_code'
+INLINE_CODE = 'inline_code'
+LINK_TARGET = 'link_target'
+URL = 'url'
+HTML = 'html'
+
+# 各類不轉換的區段，以具名群組區分；未被比對到的部分都是內文。
+# 開頭的前瞻只讓可能開始一個區段的字元進入完整比對，大部分的內文字元一次就略過
+NON_PROSE_PATTERN = re.compile(r'''
+  (?=[`~\[(<hf]|^[ ])
+  (?:
+    (?P<fenced_code>
+        ^[ ]{0,3}(?P<fence>`{3,}|~{3,})[^\n]*\n     # 開頭圍欄與語言標記
+        (?:.*?\n)??                                 # 程式碼內容
+        (?:[ ]{0,3}(?P=fence)[`~]*[ \t]*(?:\n|\Z)|\Z)  # 結尾圍欄，未結尾時延續到文件結束
+    )
+  | (?P<inline_code>
+        (?P<ticks>`+)(?:[^\n]|\n(?![ \t]*\n))*?(?<!`)(?P=ticks)(?!`)
+    )
+  | (?P<link_target>
+        (?<=\])\((?:<[^<>\n]*>|(?:[^()\s]|\([^()\s]*\))*)    # [文字](目標) 或 [文字](<含空白的目標>)
+        (?:[ \t]+(?:"[^"\n]*"|'[^'\n]*'))?[ \t]*\)            # 可選的 "標題"
+      | ^[ ]{0,3}\[[^\]\n]+\]:[ \t]*(?:<[^<>\n]*>|\S+)        # [標籤]: 目標
+        (?:[ \t]+(?:"[^"\n]*"|'[^'\n]*'))?
+    )
+  | (?P<url>
+        <(?:[A-Za-z][A-Za-z0-9+.-]{1,31}:[^\s<>]*|[^\s<>@]+@[^\s<>]+)>          # <自動連結>
+      | (?:https?|ftp)://                                     # 裸網址遇到中日韓文字或全形標點即結束，中文常不加空白緊接網址
+        [^\s<>()\[\]"'`\u2e80-\u9fff\uf900-\ufaff\ufe30-\ufe4f\uff00-\uffef\U00020000-\U0003134f]+
+    )
+  | (?P<html>
+        <!--.*?-->                                            # 註解，可跨行
+      | </?[A-Za-z][A-Za-z0-9-]*(?:\s[^<>]*)?/?>
+    )
+  )
+''', re.MULTILINE | re.DOTALL | re.VERBOSE)
+
+# 一個替換：src_* 為原文、out_* 為輸出的 UTF-8 位元組位置；替換之間的文字原樣輸出
+SourceMapping = namedtuple('SourceMapping', ['src_start', 'src_end', 'out_start', 'out_end', 'source', 'target'])
+
+
+def iter_regions(text):
+    """依序產生 (類別, start, end)，涵蓋整份文件且不重疊"""
+    pos = 0
+    for m in NON_PROSE_PATTERN.finditer(text):
+        start, end = m.span()
+        if start > pos:
+            yield PROSE, pos, start
+        # 外層群組最後結束，lastgroup 即為區段類別
+        yield m.lastgroup, start, end
+        pos = end
+    if pos < len(text):
+        yield PROSE, pos, len(text)
+
+
+class MarkdownConverter:
+    """包裝 TermConverter，只轉換 Markdown 文件中的內文"""
+
+    def __init__(self, converter):
+        self.converter = converter
+
+    def find_matches(self, text):
+        """回傳只落在內文中的最左最長比對 [(start, end, key_index), ...]，位置為原文位置
+
+        自動機只掃描 iter_regions 分出的內文區段，非內文區段由正規表示式整段略過，比對不會跨越區段邊界
+        """
+        find = self.converter.find_matches
+        matches = []
+        for kind, start, end in iter_regions(text):
+            if kind == PROSE:
+                matches.extend((start + s, start + e, index) for s, e, index in find(text[start:end]))
+        return matches
+
+    def convert(self, text):
+        """轉換文件中的內文，其他區段原樣保留"""
+        targets = self.converter.targets
+        pieces = []
+        pos = 0
+        for start, end, index in self.find_matches(text):
+            pieces.append(text[pos:start])
+            pieces.append(targets[index][0])
+            pos = end
+        pieces.append(text[pos:])
+        return ''.join(pieces)
+
+    def convert_with_map(self, text):
+        """轉換文件，並回傳每個替換在原文與輸出中的 UTF-8 位元組位置 [SourceMapping, ...]"""
+        sources = self.converter.sources
+        targets = self.converter.targets
+        pieces = []
+        mappings = []
+        src_byte = 0   # 已處理原文的位元組數
+        out_byte = 0   # 已輸出的位元組數
+        pos = 0
+        for start, end, index in self.find_matches(text):
+            before = text[pos:start]
+            n = len(before.encode('utf-8'))
+            src_byte += n
+            out_byte += n
+            target = targets[index][0]
+            src_len = len(text[start:end].encode('utf-8'))
+            out_len = len(target.encode('utf-8'))
+            mappings.append(SourceMapping(src_byte, src_byte + src_len, out_byte, out_byte + out_len,
+                                          sources[index], target))
+            src_byte += src_len
+            out_byte += out_len
+            pieces.append(before)
+            pieces.append(target)
+            pos = end
+        pieces.append(text[pos:])
+        return ''.join(pieces), mappings
+
+
+def load_markdown_converter(terms_file=TERMS_FILE, packed=False, direction='cn2tw'):
+    return MarkdownConverter(load_converter(terms_file, packed=packed, direction=direction))
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='轉換 Markdown 文件中的內文，保留程式碼、連結目標與網址。')
+    parser.add_argument('files', nargs='*', help='要轉換的檔案，未指定時讀取標準輸入')
+    parser.add_argument('--terms', '-t', default=TERMS_FILE, help='術語對照表路徑')
+    parser.add_argument('--packed', action='store_true', help='使用 mmap 的二進位字典（見 term_dict.py）')
+    parser.add_argument('--reverse', '-r', action='store_true', help='反向轉換：台灣用語 → 中國大陸用語')
+    parser.add_argument('--source-map', action='store_true',
+                        help='以 JSON Lines 輸出轉換結果與各替換的 UTF-8 位元組位置')
+    parser.add_argument('--regions', action='store_true', help='只輸出各區段的分類，不轉換')
+    args = parser.parse_args()
+
+    markdown = load_markdown_converter(args.terms, args.packed, 'tw2cn' if args.reverse else 'cn2tw')
+    for path in args.files or ['-']:
+        if path == '-':
+            text = sys.stdin.read()
+        else:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                text = f.read()
+        if args.regions:
+            for kind, start, end in iter_regions(text):
+                sys.stdout.write(json.dumps({'file': path, 'kind': kind, 'start': start, 'end': end,
+                                             'text': text[start:end]}, ensure_ascii=False) + '\n')
+        elif args.source_map:
+            converted, mappings = markdown.convert_with_map(text)
+            record = {'file': path, 'text': converted, 'mappings': [m._asdict() for m in mappings]}
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            sys.stdout.write(markdown.convert(text))
+
+
+if __name__ == '__main__':
+    main()
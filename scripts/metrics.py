@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+執行量測
+記錄每個階段的耗時與計數，輸出為 JSON 記錄或 Prometheus textfile（node_exporter textfile collector 格式），
+供排程工作告警使用，不必再從記錄訊息中擷取數字
+"""
+
+import json
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from term_store import atomic_open
+
+METRIC_NAME_UNSAFE = re.compile(r'[^a-zA-Z0-9_]')
+
+
+class RunMetrics:
+    """一次執行的階段耗時與計數"""
+
+    def __init__(self, job):
+        self.job = job
+        self.started_at = time.time()
+        self.stages = {}     # 階段名稱 → 累計秒數，依第一次執行的順序
+        self.counters = {}   # 計數名稱 → 數值
+        self.success = None
+
+    @contextmanager
+    def stage(self, name):
+        """量測一個階段的實際經過時間，同名階段重複執行時累加"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    def to_dict(self):
+        return {
+            'job': self.job,
+            'started_at': datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(timespec='seconds'),
+            'duration_seconds': round(time.time() - self.started_at, 6),
+            'success': self.success,
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def write_json(self, path):
+        """寫出一筆 JSON 記錄"""
+        with atomic_open(path) as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+    def to_prometheus(self):
+        """轉為 Prometheus 文字格式"""
+        prefix = METRIC_NAME_UNSAFE.sub('_', self.job)
+        record = self.to_dict()
+        lines = [
+            f'# HELP {prefix}_stage_seconds Wall time spent in each stage of the last run.',
+            f'# TYPE {prefix}_stage_seconds gauge',
+        ]
+        for name, seconds in record['stages'].items():
+            lines.append(f'{prefix}_stage_seconds{{stage="{name}"}} {seconds}')
+        for name, value in record['counters'].items():
+            metric = f'{prefix}_{METRIC_NAME_UNSAFE.sub("_", name)}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {int(value) if isinstance(value, bool) else value}')
+        lines += [
+            f'# TYPE {prefix}_duration_seconds gauge',
+            f'{prefix}_duration_seconds {record["duration_seconds"]}',
+            f'# TYPE {prefix}_success gauge',
+            f'{prefix}_success {1 if self.success else 0}',
+            f'# TYPE {prefix}_last_run_timestamp_seconds gauge',
+            f'{prefix}_last_run_timestamp_seconds {int(self.started_at)}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """寫出 Prometheus textfile；先寫暫存檔再 rename，collector 不會讀到寫到一半的檔案"""
+        with atomic_open(path) as f:
+            f.write(self.to_prometheus())
@@ -4,91 +4,117 @@
 自動從 terms.csv 修改或刪除指定詞彙的對應內容，刪除時才記錄到 deleted_terms.txt，確保冪等性。
 """
 
-import csv
 import sys
-import os
+import shlex
 import argparse
 
+from term_store import TermStore
+
 TERMS_FILE = 'terms.csv'
 DELETED_TERMS_FILE = 'deleted_terms.txt'
 
-def modify_term(cn_term, new_tw=None, delete_mode=False):
-    # 讀取現有 terms
-    terms = []
-    old_tw_set = set()
-    found = False
-    with open(TERMS_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['cn'] == cn_term:
-                found = True
-                old_tw_set = set(t.strip() for t in row['tw'].split(';') if t.strip())
-                if new_tw is None or not new_tw.strip():
-                    # 整組刪除
-                    if delete_mode:
-                        continue  # 不寫入 terms.csv
-                    else:
-                        # 修改模式下，整組刪除等同於刪除
-                        continue
-                else:
-                    new_tw_set = set(t.strip() for t in new_tw.split(';') if t.strip())
-                    # 只保留新內容
-                    if new_tw_set:
-                        row['tw'] = ';'.join(sorted(new_tw_set))
-                        terms.append(row)
-            else:
-                terms.append(row)
-    if not found:
+def modify_term(cn_term, new_tw=None, delete_mode=False, store=None):
+    # 讀取現有 terms（可傳入已載入的 TermStore 共用）
+    if store is None:
+        store = TermStore(TERMS_FILE, deleted_file=DELETED_TERMS_FILE)
+    result = store.edit(cn_term, new_tw, delete_mode)
+    if not result.found:
         print(f'未找到詞彙：{cn_term}')
-        return
+        return result
 
-    # 寫回 terms.csv
-    with open(TERMS_FILE, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['cn', 'tw'])
-        writer.writeheader()
-        for row in terms:
-            writer.writerow(row)
+    # 寫回 terms.csv（保留原本順序）
+    store.export_terms(TERMS_FILE, sort=False)
 
     if not delete_mode:
         print(f"已修改 {cn_term} 對應內容，未記錄到 deleted_terms.txt（冪等）")
-        return
+        return result
 
     # 記錄到 deleted_terms.txt（避免重複，僅刪除模式）
-    already = set()
-    if os.path.exists(DELETED_TERMS_FILE):
-        with open(DELETED_TERMS_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    already.add(line)
-
-    # 記錄被移除的對應
-    if new_tw is None or not new_tw.strip():
-        # 整組刪除
-        for tw in sorted(old_tw_set):
-            record = f"{cn_term},{tw}"
-            if record not in already:
-                with open(DELETED_TERMS_FILE, 'a', encoding='utf-8') as f:
-                    f.write(record + '\n')
-                print(f"已刪除並記錄：{record}")
-            else:
-                print(f"已刪除，記錄已存在：{record}")
-    else:
-        new_tw_set = set(t.strip() for t in new_tw.split(';') if t.strip())
-        removed = old_tw_set - new_tw_set
-        for tw in sorted(removed):
-            record = f"{cn_term},{tw}"
-            if record not in already:
-                with open(DELETED_TERMS_FILE, 'a', encoding='utf-8') as f:
-                    f.write(record + '\n')
-                print(f"已移除並記錄：{record}")
-            else:
-                print(f"已移除，記錄已存在：{record}")
+    if result.recorded:
+        with open(DELETED_TERMS_FILE, 'a', encoding='utf-8') as f:
+            for record in result.recorded:
+                f.write(record + '\n')
+    action = '已刪除' if new_tw is None or not new_tw.strip() else '已移除'
+    for record in sorted(result.recorded + result.already_recorded):
+        if record in result.recorded:
+            print(f"{action}並記錄：{record}")
+        else:
+            print(f"{action}，記錄已存在：{record}")
+    return result
 
-if __name__ == '__main__':
+def parse_batch_line(line):
+    """解析批次檔的一行，格式與命令列相同：中國大陸詞 [新的台灣詞] [--delete|-d]"""
+    tokens = shlex.split(line)
+    delete_mode = any(t in ('-d', '--delete') for t in tokens)
+    args = [t for t in tokens if t not in ('-d', '--delete')]
+    if not args or len(args) > 2:
+        raise ValueError(f'格式錯誤：{line}')
+    return args[0], args[1] if len(args) > 1 else None, delete_mode
+
+
+def modify_terms_batch(lines, store=None):
+    """批次套用修改與刪除：全部在記憶體中處理，最後以暫存檔加 rename 各寫回一次；內容未變更的檔案不寫回"""
+    if store is None:
+        store = TermStore(TERMS_FILE, deleted_file=DELETED_TERMS_FILE)
+    modified = 0
+    deleted = 0
+    not_found = []
+    recorded = []
+    already_recorded = 0
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            cn_term, new_tw, delete_mode = parse_batch_line(line)
+        except ValueError as e:
+            print(f'第 {lineno} 行略過，{e}')
+            continue
+        result = store.edit(cn_term, new_tw, delete_mode)
+        if not result.found:
+            not_found.append(cn_term)
+            continue
+        if result.new_tw is None:
+            deleted += 1
+        elif result.new_tw != result.old_tw:
+            modified += 1
+        recorded.extend(result.recorded)
+        already_recorded += len(result.already_recorded)
+
+    if modified or deleted:
+        store.export_terms(TERMS_FILE, sort=False)
+    if recorded:
+        store.export_deleted(DELETED_TERMS_FILE)
+
+    print(f"批次處理完成：修改 {modified} 個，整組刪除 {deleted} 個，"
+          f"新增刪除記錄 {len(recorded)} 筆，記錄已存在 {already_recorded} 筆")
+    for record in recorded:
+        print(f"  已記錄：{record}")
+    if not_found:
+        print(f"未找到詞彙：{'、'.join(not_found)}")
+    return store
+
+
+def main():
+    """主函式"""
     parser = argparse.ArgumentParser(description='修改或刪除 terms.csv 的對應內容。')
-    parser.add_argument('cn_term', help='中國大陸詞')
+    parser.add_argument('cn_term', nargs='?', help='中國大陸詞')
     parser.add_argument('new_tw', nargs='?', default=None, help='新的台灣詞（多個用分號分隔）')
     parser.add_argument('--delete', '-d', action='store_true', help='刪除模式，會記錄到 deleted_terms.txt')
+    parser.add_argument('--batch', '-b', metavar='FILE',
+                        help='批次模式：從檔案（- 為標準輸入）逐行讀取「中國大陸詞 [新的台灣詞] [-d]」，最後一次寫回')
     args = parser.parse_args()
-    modify_term(args.cn_term, args.new_tw, args.delete) 
\ No newline at end of file
+    if args.batch:
+        if args.batch == '-':
+            modify_terms_batch(sys.stdin)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                modify_terms_batch(f)
+    elif args.cn_term:
+        modify_term(args.cn_term, args.new_tw, args.delete)
+    else:
+        parser.error('請指定中國大陸詞或 --batch')
+
+
+if __name__ == '__main__':
+    main()
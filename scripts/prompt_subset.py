@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+依輸入內容產生精簡 prompt
+掃描一次要轉換的文本，只把文本中實際出現的術語（簡體或轉繁體後的寫法）放進轉換規則，
+格式與 README 中的完整 prompt 相同；需要時仍可輸出完整術語表
+"""
+
+import argparse
+import sys
+from functools import lru_cache
+
+from term_converter import TERMS_FILE, AhoCorasick, split_alternatives
+from update_terms import BLOCK_START, build_terms_block, load_rows, render_line, traditional_converter
+
+
+class PromptSubsetter:
+    """以 cn 及其繁體寫法建立的索引，找出文本用到的術語列
+
+    direction 為 tw2cn 時改以各列的台灣用語建立反向索引，供台灣用語 → 中國大陸用語的文本使用
+    """
+
+    def __init__(self, rows, direction='cn2tw'):
+        self.rows = list(rows)
+        self.direction = direction
+        trads = traditional_converter().convert_many(cn for cn, _ in self.rows)
+        self.lines = [render_line(cn_trad, tw) for cn_trad, (_, tw) in zip(trads, self.rows)]
+        key_rows = {}
+        for index, (cn, tw) in enumerate(self.rows):
+            if direction == 'tw2cn':
+                for alternative in split_alternatives(tw):
+                    key_rows.setdefault(alternative, []).append(index)
+                continue
+            key_rows.setdefault(cn, []).append(index)
+            if trads[index] != cn:
+                key_rows.setdefault(trads[index], []).append(index)
+        keys = [key for key in key_rows if key]
+        self.key_rows = [key_rows[key] for key in keys]
+        self.automaton = AhoCorasick(keys)
+
+    @classmethod
+    def from_csv(cls, terms_file=TERMS_FILE, direction='cn2tw'):
+        return cls(load_rows(terms_file), direction)
+
+    def matching_rows(self, text):
+        """回傳文本中出現的術語列索引，依 terms.csv 的順序排列"""
+        rows = set()
+        for index in self.automaton.matched_keys(text):
+            rows.update(self.key_rows[index])
+        return sorted(rows)
+
+    def terms_block(self, text=None):
+        """術語表區塊；text 為 None 時輸出完整術語表"""
+        if text is None:
+            return build_terms_block(self.lines)
+        return build_terms_block([self.lines[i] for i in self.matching_rows(text)])
+
+    def build_prompt(self, text, full=False):
+        """產生完整的轉換 prompt，full 為 True 時使用與 README 相同的完整術語表"""
+        return BLOCK_START + self.terms_block(None if full else text) + text
+
+
+@lru_cache(maxsize=None)
+def load_subsetter(terms_file=TERMS_FILE, direction='cn2tw'):
+    """每個術語檔與方向只建立一次索引"""
+    return PromptSubsetter.from_csv(terms_file, direction)
+
+
+def build_prompt(text, terms_file=TERMS_FILE, full=False, direction='cn2tw'):
+    return load_subsetter(terms_file, direction).build_prompt(text, full)
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='只以文本中出現的術語產生轉換 prompt。')
+    parser.add_argument('source', nargs='?', default='-', help='要轉換的文本檔，- 表示標準輸入')
+    parser.add_argument('--terms', '-t', default=TERMS_FILE, help='術語對照表路徑')
+    parser.add_argument('--full', action='store_true', help='使用完整術語表（與 README 相同）')
+    parser.add_argument('--stats', action='store_true', help='在標準錯誤輸出選用的術語數')
+    parser.add_argument('--reverse', '-r', action='store_true', help='文本為台灣用語，以台灣用語比對術語')
+    args = parser.parse_args()
+
+    if args.source == '-':
+        text = sys.stdin.read()
+    else:
+        with open(args.source, encoding='utf-8') as f:
+            text = f.read()
+
+    subsetter = load_subsetter(args.terms, 'tw2cn' if args.reverse else 'cn2tw')
+    sys.stdout.write(subsetter.build_prompt(text, args.full))
+    if args.stats:
+        selected = len(subsetter.rows) if args.full else len(subsetter.matching_rows(text))
+        print(f"使用 {selected} / {len(subsetter.rows)} 個術語", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,278 +5,509 @@
 自動從維基教科書爬取中國大陸台灣計算機術語對照表並更新本地 CSV 檔案
 """
 
-import requests
-from bs4 import BeautifulSoup
-import csv
+import json
 import re
 import logging
-from datetime import datetime
+from functools import lru_cache
 import os
+import argparse
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from lint_terms import lint_terms, summarize, traditional_function
+from metrics import RunMetrics
+from term_history import DEFAULT_KEEP, HISTORY_FILE, TermHistory
+from term_store import TermStore, write_terms_csv
 
 # 設定記錄
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# MediaWiki 頁面內嵌設定中的修訂版本編號
+REVISION_PATTERN = re.compile(r'"wgCurRevisionId"\s*:\s*(\d+)')
+
+WIKITABLE_CLASS = 'wikitable'
+
+DEFAULT_URL = "https://zh.wikibooks.org/w/index.php?title=%E5%A4%A7%E9%99%86%E5%8F%B0%E6%B9%BE%E8%AE%A1%E7%AE%97%E6%9C%BA%E6%9C%AF%E8%AF%AD%E5%AF%B9%E7%85%A7%E8%A1%A8&variant=zh"
+
+# 一個術語來源：tw_column / cn_column 為 wikitable 中台灣與中國大陸用語所在的欄位，
+# parse 可指定自訂解析函式 (html) -> [(cn, tw), ...]，取代預設的表格解析；
+# 來源設定 JSON 中的 "parse" 為以 register_parser 註冊的名稱
+Source = namedtuple('Source', ['name', 'url', 'tw_column', 'cn_column', 'parse'], defaults=(1, 2, None))
+# 一個來源的取得結果：html 為 None 且 unchanged 為 False 表示取得失敗；
+# unchanged 為 True 時，304 的 html 為 None，修訂版本相同的 200 回應仍保留已下載的 html
+FetchResult = namedtuple('FetchResult', ['source', 'html', 'meta', 'unchanged', 'nbytes'])
+
+
+# 自訂解析函式的註冊表：名稱 → (html) -> [(cn, tw), ...]
+PARSERS = {}
+
+
+def register_parser(name):
+    """將解析函式註冊為 name，供來源設定 JSON 的 "parse" 欄位使用"""
+    def decorator(func):
+        PARSERS[name] = func
+        return func
+    return decorator
+
+
+def load_sources(path):
+    """讀取來源設定 JSON：[{"name": ..., "url": ..., "tw_column": 1, "cn_column": 2, "parse": "名稱"}, ...]
+
+    未知的欄位、缺少 name 或 url、欄位位置不是整數、未註冊的解析函式名稱都會丟出 ValueError
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    if not isinstance(items, list):
+        raise ValueError(f"來源設定 {path} 必須是來源的陣列")
+    sources = []
+    for index, item in enumerate(items):
+        where = f"來源設定 {path} 第 {index + 1} 項"
+        if not isinstance(item, dict):
+            raise ValueError(f"{where}必須是物件")
+        unknown = sorted(set(item) - set(Source._fields))
+        if unknown:
+            raise ValueError(f"{where}有未知的欄位: {', '.join(unknown)}（可用欄位: {', '.join(Source._fields)}）")
+        missing = [field for field in ('name', 'url') if not item.get(field)]
+        if missing:
+            raise ValueError(f"{where}缺少欄位: {', '.join(missing)}")
+        for field in ('tw_column', 'cn_column'):
+            if field in item and (not isinstance(item[field], int) or isinstance(item[field], bool) or item[field] < 0):
+                raise ValueError(f"{where}的 {field} 必須是非負整數")
+        parse = item.get('parse')
+        if parse is not None:
+            if not isinstance(parse, str) or parse not in PARSERS:
+                available = ', '.join(sorted(PARSERS)) or '無'
+                raise ValueError(f"{where}的解析函式 {parse!r} 未註冊（已註冊: {available}）")
+            item = dict(item, parse=PARSERS[parse])
+        sources.append(Source(**item))
+    return sources
+
+# 術語清理與拆分用的正規表示式，只編譯一次
+WHITESPACE_PATTERN = re.compile(r'\s+')
+BRACKET_PATTERN = re.compile(r'\[.*?\]')           # 方括號內容
+PAREN_PATTERN = re.compile(r'\(.*?\)')             # 圓括號內容
+FULLWIDTH_PAREN_PATTERN = re.compile(r'（.*?）')    # 中文圓括號內容
+SPECIAL_CHAR_PATTERN = re.compile(r'[^\w\s\u4e00-\u9fff]')
+CHINESE_CHAR_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+SEPARATOR_PATTERN = re.compile(r'[\s,，、]')
+
+
+@lru_cache(maxsize=None)
+def clean_term(term):
+    """清理術語文字"""
+    if not term:
+        return ""
+
+    # 移除多餘的空白字元
+    term = WHITESPACE_PATTERN.sub(' ', term.strip())
+
+    # 移除常見的標記
+    term = BRACKET_PATTERN.sub('', term)
+    term = PAREN_PATTERN.sub('', term)
+    term = FULLWIDTH_PAREN_PATTERN.sub('', term)
+
+    # 移除特殊字元
+    term = SPECIAL_CHAR_PATTERN.sub('', term)
+
+    return term.strip()
+
+
+def is_chinese_term(term):
+    """檢查是否為中文術語（包含中文字元）"""
+    if not term:
+        return False
+
+    # 檢查是否包含中文字元
+    return CHINESE_CHAR_PATTERN.search(term) is not None
+
+
+def split_terms(term):
+    """拆分包含多個詞彙的術語（不做 clean）"""
+    if not term:
+        return []
+
+    # 先按分號拆分，再按其他分隔符號拆分
+    # 例如：「存取 (win)；取用 (mac)」應該拆分為「存取 (win)」和「取用 (mac)」
+    result = []
+    for part in term.split('；'):
+        # 對每個分號分隔的部分，再按其他分隔符號拆分
+        sub_parts = SEPARATOR_PATTERN.split(part.strip())
+        result.extend([p.strip() for p in sub_parts if p.strip()])
+
+    return result
+
+
+@lru_cache(maxsize=None)
+def normalize_cell(cell_text):
+    """將儲存格文字拆分並清理為中文術語 tuple，相同內容只計算一次"""
+    return tuple(clean_term(t) for t in split_terms(cell_text) if is_chinese_term(t))
+
+
+# BeautifulSoup get_text 不包含這些元素內的文字（MediaWiki TemplateStyles 會在內文中插入 <style>）
+NON_TEXT_TAGS = frozenset(('script', 'style', 'template'))
+
+
+def element_text(elem):
+    """與 BeautifulSoup get_text(strip=True) 相同：串接所有文字節點並各自去除空白，忽略註解與 script、style 的內容"""
+    parts = []
+    if elem.text and elem.text.strip():
+        parts.append(elem.text.strip())
+    for child in elem:
+        # 註解的 tag 不是字串；略過的元素之後的文字（tail）仍屬於 elem
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            parts.append(element_text(child))
+        if child.tail and child.tail.strip():
+            parts.append(child.tail.strip())
+    return ''.join(parts)
+
 class WikiTermsScraper:
-    def __init__(self):
-        self.url = "https://zh.wikibooks.org/w/index.php?title=%E5%A4%A7%E9%99%86%E5%8F%B0%E6%B9%BE%E8%AE%A1%E7%AE%97%E6%9C%BA%E6%9C%AF%E8%AF%AD%E5%AF%B9%E7%85%A7%E8%A1%A8&variant=zh"
+    def __init__(self, parser='lxml'):
+        self.url = DEFAULT_URL
+        self.sources = None  # [Source, ...]；None 表示只取得 self.url
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         self.terms_file = 'terms.csv'
         self.wiki_snapshot_file = 'wiki_terms_snapshot.csv'  # 新增快照檔案
         self.deleted_terms_file = 'deleted_terms.txt'  # 新增刪除詞彙記錄檔
+        self.wiki_meta_file = 'wiki_terms_snapshot.meta.json'  # 快照對應的 ETag、Last-Modified 與修訂版本
+        self.history_file = HISTORY_FILE  # terms.csv 歷史版本
+        self.history_keep = DEFAULT_KEEP  # 保留的歷史版本數
+        self.timeout = 30  # 每個請求的連線與讀取逾時秒數
+        self.per_host_limit = 2  # 同一主機同時進行的請求數上限
+        self.max_concurrency = 8  # 所有來源同時進行的請求數上限
+        self.parser = parser  # 'lxml'（串流解析表格列）或 'bs4'（BeautifulSoup 完整解析）
+        self.page_unchanged = False  # 頁面自上次快照後未變更
+        self._session = None
+        self._fetched_meta = None
+        self._store = None
+        self.metrics = RunMetrics('wiki_terms_scraper')  # 各階段耗時與計數
+        self.merge_stats = None
+
+    @property
+    def session(self):
+        """共用連線池並自動重試的 requests.Session"""
+        if self._session is None:
+            # requests 載入較慢，只在需要連網時匯入
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                          allowed_methods=['GET', 'HEAD'])
+            adapter = HTTPAdapter(max_retries=retry, pool_maxsize=max(10, self.max_concurrency))
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    def load_wiki_meta(self):
+        """載入快照對應的頁面中繼資料，回傳 {url: {etag, last_modified, revision}}"""
+        if not os.path.exists(self.wiki_meta_file) or not os.path.exists(self.wiki_snapshot_file):
+            # 沒有快照時中繼資料沒有意義，必須完整取得
+            return {}
+        try:
+            with open(self.wiki_meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"載入頁面中繼資料失敗: {e}")
+            return {}
+
+    def save_wiki_meta(self):
+        """儲存這次取得頁面的中繼資料，應在快照寫入後呼叫"""
+        if not self._fetched_meta:
+            return
+        meta = self.load_wiki_meta()
+        meta.update(self._fetched_meta)
+        try:
+            with open(self.wiki_meta_file, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2, sort_keys=True)
+                f.write('\n')
+        except OSError as e:
+            logger.error(f"儲存頁面中繼資料失敗: {e}")
         
-    def fetch_wiki_page(self):
-        """取得維基教科書頁面內容"""
+    def source_list(self):
+        """要取得的來源，依設定順序"""
+        return list(self.sources) if self.sources else [Source('wikibooks', self.url)]
+
+    def _fetch_source(self, source, previous, conditional=True):
+        """取得一個來源（在工作執行緒中執行）；304 或修訂版本與上次相同時標記為未變更"""
+        from requests import RequestException
+        headers = {}
+        if conditional and previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if conditional and previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
         try:
-            logger.info(f"正在取得頁面: {self.url}")
-            response = requests.get(self.url, headers=self.headers, timeout=30)
+            logger.info(f"正在取得頁面: {source.url}")
+            response = self.session.get(source.url, headers=headers, timeout=self.timeout)
+            nbytes = len(response.content)
+            if response.status_code == 304:
+                logger.info(f"頁面未變更（304 Not Modified）: {source.name}")
+                return FetchResult(source, None, None, True, nbytes)
             response.raise_for_status()
             response.encoding = 'utf-8'
-            return response.text
-        except requests.RequestException as e:
-            logger.error(f"取得頁面失敗: {e}")
-            return None
+            html_content = response.text
+        except RequestException as e:
+            logger.error(f"取得頁面失敗（{source.name}）: {e}")
+            return FetchResult(source, None, None, False, 0)
+
+        match = REVISION_PATTERN.search(html_content)
+        revision = int(match.group(1)) if match else None
+        meta = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'revision': revision,
+        }
+        if conditional and revision is not None and revision == previous.get('revision'):
+            logger.info(f"頁面修訂版本未變更（{source.name}）: {revision}")
+            return FetchResult(source, html_content, meta, True, nbytes)
+        return FetchResult(source, html_content, meta, False, nbytes)
+
+    async def _fetch_concurrently(self, sources, previous, conditional):
+        """以 asyncio 排程所有來源，共用同一個連線池；每個主機另以 semaphore 限制同時請求數"""
+        loop = asyncio.get_running_loop()
+        semaphores = {}
+
+        async def fetch(source, executor):
+            host = urlsplit(source.url).netloc
+            semaphore = semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+            async with semaphore:
+                return await loop.run_in_executor(executor, self._fetch_source, source,
+                                                  previous.get(source.url, {}), conditional)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return await asyncio.gather(*(fetch(source, executor) for source in sources))
+
+    def fetch_sources(self, sources=None):
+        """並行取得所有來源，結果依來源順序排列（與完成順序無關）
+
+        全部來源都未變更時設定 page_unchanged；只有部分來源變更時，回應 304 而沒有內容的來源會再完整取得一次，
+        合併時才能涵蓋所有來源的術語，修訂版本相同的來源直接使用已下載的內容
+        """
+        sources = sources or self.source_list()
+        self.page_unchanged = False
+        previous = self.load_wiki_meta()
+        results = list(asyncio.run(self._fetch_concurrently(sources, previous, True)))
+        self._fetched_meta = {r.source.url: r.meta for r in results if r.meta}
+        if all(r.unchanged for r in results):
+            self.page_unchanged = True
+            # 仍更新 ETag 等資訊，下次可直接以 304 略過
+            self.save_wiki_meta()
+            return results
+        stale = [i for i, r in enumerate(results) if r.unchanged and r.html is None]
+        if stale and all(r.html is not None or r.unchanged for r in results):
+            refetched = asyncio.run(self._fetch_concurrently([results[i].source for i in stale], previous, False))
+            for i, result in zip(stale, refetched):
+                results[i] = result._replace(nbytes=result.nbytes + results[i].nbytes)
+                if result.meta:
+                    self._fetched_meta[result.source.url] = result.meta
+        return results
+
+    def fetch_wiki_page(self):
+        """取得維基教科書頁面內容；頁面未變更（304 或修訂版本相同）時設定 page_unchanged 並回傳 None"""
+        result = self.fetch_sources([Source('wikibooks', self.url)])[0]
+        self.metrics.set('bytes_fetched', result.nbytes)
+        return None if result.unchanged else result.html
             
-    def parse_terms_table(self, html_content):
-        """解析頁面中的術語對照表"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+    def parse_terms_table(self, html_content, source=None):
+        """解析頁面中的術語對照表；source 指定該來源的欄位位置或自訂解析函式"""
+        if source is not None and source.parse is not None:
+            return source.parse(html_content)
+        columns = (source.tw_column, source.cn_column) if source is not None else (1, 2)
         terms = []
-        
+        for tw_cell, cn_cell in self.iter_table_cells(html_content, *columns):
+            # 先 split 再 clean（結果依儲存格內容快取）
+            cn_terms = normalize_cell(cn_cell)
+            tw_terms = normalize_cell(tw_cell)
+            if not cn_terms or not tw_terms:
+                continue
+
+            # 按位置對應：中國大陸詞和台灣詞一一對應
+            # 如果數量不符合，則每個中國大陸詞對應所有台灣詞
+            if len(cn_terms) == len(tw_terms):
+                # 一一對應
+                for i, cn in enumerate(cn_terms):
+                    tw_str = tw_terms[i]
+                    if cn != tw_str:
+                        terms.append((cn, tw_str))
+            else:
+                # 數量不符合時，每個中國大陸詞對應所有台灣詞
+                tw_str = ';'.join(sorted(set(tw_terms)))
+                for cn in cn_terms:
+                    if cn != tw_str:
+                        terms.append((cn, tw_str))
+        logger.info(f"從{source.name if source is not None else '維基教科書'}解析到 {len(terms)} 個術語對照")
+        return terms
+
+    def iter_table_cells(self, html_content, tw_column=1, cn_column=2):
+        """逐列產生 wikitable 中的 (台灣用語, 中國大陸用語) 儲存格文字，依 self.parser 選擇解析器"""
+        if self.parser == 'lxml':
+            try:
+                return self._iter_cells_lxml(html_content, tw_column, cn_column)
+            except ImportError:
+                logger.warning("未安裝 lxml，改用 BeautifulSoup 解析")
+        return self._iter_cells_bs4(html_content, tw_column, cn_column)
+
+    def _iter_cells_bs4(self, html_content, tw_column=1, cn_column=2):
+        """以 BeautifulSoup 建立完整文件樹後尋找表格"""
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_content, 'html.parser')
+
         # 尋找表格
         tables = soup.find_all('table', class_='wikitable')
-        
+
         for table in tables:
             rows = table.find_all('tr')
             for row in rows[1:]:  # 跳過標題行
                 cells = row.find_all(['td', 'th'])
-                if len(cells) >= 3:
+                if len(cells) > max(tw_column, cn_column):
                     # 正確抓取：中國大陸用語 → 台灣用語
-                    cn_cell = cells[2].get_text(strip=True)
-                    tw_cell = cells[1].get_text(strip=True)
-                    
-                    # 先 split 再 clean
-                    raw_cn_terms = self.split_terms(cn_cell)
-                    raw_tw_terms = self.split_terms(tw_cell)
-                    cn_terms = [self.clean_term(t) for t in raw_cn_terms if self.is_chinese_term(t)]
-                    tw_terms = [self.clean_term(t) for t in raw_tw_terms if self.is_chinese_term(t)]
-                    if not cn_terms or not tw_terms:
-                        continue
-                    
-                    # 按位置對應：中國大陸詞和台灣詞一一對應
-                    # 如果數量不符合，則每個中國大陸詞對應所有台灣詞
-                    if len(cn_terms) == len(tw_terms):
-                        # 一一對應
-                        for i, cn in enumerate(cn_terms):
-                            tw_str = tw_terms[i]
-                            if cn != tw_str:
-                                terms.append((cn, tw_str))
-                    else:
-                        # 數量不符合時，每個中國大陸詞對應所有台灣詞
-                        for cn in cn_terms:
-                            tw_str = ';'.join(sorted(set(tw_terms)))
-                            if cn != tw_str:
-                                terms.append((cn, tw_str))
-        logger.info(f"從維基教科書解析到 {len(terms)} 個術語對照")
-        return terms
-        
+                    yield cells[tw_column].get_text(strip=True), cells[cn_column].get_text(strip=True)
+
+    def _iter_cells_lxml(self, html_content, tw_column=1, cn_column=2):
+        """以 lxml iterparse 串流解析，只處理 table 與 tr；最外層表格的列處理完即清除，表格結束時整個釋放"""
+        from io import BytesIO
+        from lxml import etree
+
+        events = etree.iterparse(BytesIO(html_content.encode('utf-8')), events=('start', 'end'),
+                                 tag=('table', 'tr'), html=True, encoding='utf-8')
+        return self._walk_lxml_events(events, tw_column, cn_column)
+
+    def _walk_lxml_events(self, events, tw_column=1, cn_column=2):
+        # 與 BeautifulSoup 版本相同：每個 wikitable 的 find_all('tr') 包含巢狀表格的列且跳過第一列，
+        # 結果依表格開始的順序輸出，表格內依列開始的順序（外層列在其中巢狀表格的列之前），
+        # 因此列開始時先保留位置，最外層表格結束前暫存各表格的列
+        tables = []          # 目前所在的表格，[是否為 wikitable, 已看到的列數, 暫存的列]
+        group = []           # 目前最外層表格內的 wikitable，依開始順序
+        pending = {}         # tr 元素 → [(需要收錄此列的表格, 保留的位置), ...]
+        for event, elem in events:
+            if elem.tag == 'table':
+                if event == 'start':
+                    table = [WIKITABLE_CLASS in (elem.get('class') or '').split(), 0, []]
+                    tables.append(table)
+                    if table[0]:
+                        group.append(table)
+                    continue
+                tables.pop()
+                if not tables:
+                    for table in group:
+                        yield from (pair for pair in table[2] if pair is not None)
+                    group = []
+                    elem.clear()
+                continue
+            if event == 'start':
+                targets = []
+                for table in tables:
+                    if table[0]:
+                        if table[1] > 0:
+                            targets.append((table, len(table[2])))
+                            table[2].append(None)
+                        table[1] += 1
+                if targets:
+                    pending[elem] = targets
+                continue
+            targets = pending.pop(elem, None)
+            if targets:
+                cells = list(elem.iter('td', 'th'))
+                if len(cells) > max(tw_column, cn_column):
+                    pair = (element_text(cells[tw_column]), element_text(cells[cn_column]))
+                    for table, slot in targets:
+                        table[2][slot] = pair
+            # 巢狀表格的列仍是外層列的一部分，外層的 find_all 也會用到，只清除最外層表格的列
+            if len(tables) == 1:
+                elem.clear()
+
     def clean_term(self, term):
         """清理術語文字"""
-        if not term:
-            return ""
-            
-        # 移除多餘的空白字元
-        term = re.sub(r'\s+', ' ', term.strip())
-        
-        # 移除常見的標記
-        term = re.sub(r'\[.*?\]', '', term)  # 移除方括號內容
-        term = re.sub(r'\(.*?\)', '', term)  # 移除圓括號內容
-        term = re.sub(r'（.*?）', '', term)  # 移除中文圓括號內容
-        
-        # 移除特殊字元
-        term = re.sub(r'[^\w\s\u4e00-\u9fff]', '', term)
-        
-        return term.strip()
-        
+        return clean_term(term)
+
     def is_chinese_term(self, term):
         """檢查是否為中文術語（包含中文字元）"""
-        if not term:
-            return False
-        
-        # 檢查是否包含中文字元
-        chinese_chars = re.findall(r'[\u4e00-\u9fff]', term)
-        return len(chinese_chars) > 0
-        
+        return is_chinese_term(term)
+
     def split_terms(self, term):
         """拆分包含多個詞彙的術語（不做 clean）"""
-        if not term:
-            return []
-        
-        # 先按分號拆分，再按其他分隔符號拆分
-        # 例如：「存取 (win)；取用 (mac)」應該拆分為「存取 (win)」和「取用 (mac)」
-        semicolon_parts = term.split('；')
-        result = []
-        
-        for part in semicolon_parts:
-            # 對每個分號分隔的部分，再按其他分隔符號拆分
-            separators = r'[\s,，、]'
-            sub_parts = re.split(separators, part.strip())
-            result.extend([p.strip() for p in sub_parts if p.strip()])
-        
-        return result
-        
+        return split_terms(term)
+
+    @property
+    def store(self):
+        """共用的 TermStore，三個術語檔案在一次執行中只載入一次"""
+        if self._store is None:
+            self._store = TermStore(self.terms_file, self.wiki_snapshot_file, self.deleted_terms_file)
+        return self._store
+
     def load_existing_terms(self):
-        """載入現有的術語對照表"""
-        existing_terms = {}
-        if os.path.exists(self.terms_file):
-            try:
-                with open(self.terms_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        existing_terms[row['cn']] = row['tw']
-                logger.info(f"載入現有術語 {len(existing_terms)} 個")
-            except Exception as e:
-                logger.error(f"載入現有術語失敗: {e}")
-        return existing_terms
-        
+        """載入現有的術語對照表；回傳 TermStore 內部的 dict，merge_terms 會就地更新它"""
+        return self.store.terms
+
     def save_wiki_snapshot(self, wiki_terms_dict):
         """儲存維基教科書術語快照到 CSV 檔案"""
         try:
-            with open(self.wiki_snapshot_file, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['cn', 'tw'])
-                sorted_terms = sorted(wiki_terms_dict.items(), key=lambda x: x[0])
-                for cn_term, tw_term in sorted_terms:
-                    writer.writerow([cn_term, tw_term])
+            self.store.export_snapshot(wiki_terms_dict, self.wiki_snapshot_file)
             logger.info(f"成功儲存維基快照 {len(wiki_terms_dict)} 個術語到 {self.wiki_snapshot_file}")
         except Exception as e:
             logger.error(f"儲存維基快照失敗: {e}")
 
     def load_wiki_snapshot(self):
         """載入上次維基教科書術語快照"""
-        wiki_terms = {}
-        if os.path.exists(self.wiki_snapshot_file):
-            try:
-                with open(self.wiki_snapshot_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        wiki_terms[row['cn']] = row['tw']
-                logger.info(f"載入上次維基快照 {len(wiki_terms)} 個術語")
-            except Exception as e:
-                logger.error(f"載入維基快照失敗: {e}")
-        return wiki_terms
-        
+        return self.store.snapshot
+
     def load_deleted_terms(self):
         """載入本地刪除詞彙及其對應內容，回傳 dict: {cn: set(tw1, tw2, ...)}"""
-        deleted = {}
-        if os.path.exists(self.deleted_terms_file):
-            try:
-                with open(self.deleted_terms_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or ',' not in line:
-                            continue
-                        cn, tws = line.split(',', 1)
-                        cn = cn.strip()
-                        tw_set = set(t.strip() for t in tws.split(';') if t.strip())
-                        if cn in deleted:
-                            deleted[cn].update(tw_set)
-                        else:
-                            deleted[cn] = tw_set
-                logger.info(f"載入本地刪除詞彙 {len(deleted)} 筆")
-            except Exception as e:
-                logger.error(f"載入刪除詞彙失敗: {e}")
-        return deleted
-        
+        return self.store.deleted
+
     def merge_terms(self, wiki_terms, existing_terms):
-        """詞彙級合併：僅維基內容有異動的詞才自動合併，且本地刪除內容不會自動加回，只合併新內容"""
-        # 將 wiki_terms 按中國大陸詞分組
-        cn_to_tw_terms = {}
-        for cn_term, tw_term in wiki_terms:
-            if cn_term not in cn_to_tw_terms:
-                cn_to_tw_terms[cn_term] = set()
-            cn_to_tw_terms[cn_term].add(tw_term)
-        wiki_terms_dict = {cn: ';'.join(sorted(tws)) for cn, tws in cn_to_tw_terms.items()}
-
-        # 載入上次維基教科書快照
-        prev_wiki_terms = self.load_wiki_snapshot()
-        # 載入本地刪除詞彙
-        deleted_terms = self.load_deleted_terms()
-
-        merged_terms = existing_terms.copy()
-        new_terms = 0
-        updated_terms = 0
-        skipped_terms = 0
-        deleted_skipped = 0
-
-        for cn_term, new_tw in wiki_terms_dict.items():
-            prev_tw = prev_wiki_terms.get(cn_term)
-            # 如果這個詞在維基教科書快照和這次維基教科書內容一樣，保留本地內容
-            if prev_tw is not None and prev_tw == new_tw:
-                if cn_term in merged_terms:
-                    skipped_terms += 1
-                    continue  # 保留本地內容
-                else:
-                    # 本地沒有，新增
-                    merged_terms[cn_term] = new_tw
-                    new_terms += 1
-                    logger.info(f"新增術語: {cn_term} → {new_tw}")
-            else:
-                # 維基教科書內容有異動，才自動合併/覆蓋
-                if cn_term in deleted_terms:
-                    # 只合併新內容，不加回刪除內容
-                    wiki_tw_set = set(new_tw.split(';'))
-                    deleted_tw_set = deleted_terms[cn_term]
-                    new_only_set = wiki_tw_set - deleted_tw_set
-                    if new_only_set:
-                        new_only_str = ';'.join(sorted(new_only_set))
-                        merged_terms[cn_term] = new_only_str
-                        updated_terms += 1
-                        logger.info(f"只合併新內容: {cn_term} → {new_only_str}")
-                    else:
-                        deleted_skipped += 1
-                        logger.info(f"本地刪除過，且無新內容: {cn_term}，不自動加回")
-                    continue
-                if cn_term not in merged_terms:
-                    merged_terms[cn_term] = new_tw
-                    new_terms += 1
-                    logger.info(f"新增術語: {cn_term} → {new_tw}")
-                elif merged_terms[cn_term] != new_tw:
-                    old_tw = merged_terms[cn_term]
-                    merged_terms[cn_term] = new_tw
-                    updated_terms += 1
-                    logger.info(f"更新術語: {cn_term} → {old_tw} → {new_tw}")
-                else:
-                    skipped_terms += 1
-        logger.info(f"詞彙級合併：新增 {new_terms}，更新 {updated_terms}，保留本地 {skipped_terms}，本地刪除跳過 {deleted_skipped} 筆")
-        # 保留本地自訂新增的對應（維基教科書沒有的 tw_term）
-        for cn_term, tw_term in existing_terms.items():
-            if cn_term not in merged_terms:
-                merged_terms[cn_term] = tw_term
-                logger.info(f"保留本地自訂新增: {cn_term} → {tw_term}")
+        """詞彙級合併：僅維基內容有異動的詞才自動合併，且本地刪除內容不會自動加回，只合併新內容
+
+        為避免複製整份術語表，合併直接寫入 TermStore；existing_terms 為 load_existing_terms() 回傳的 dict 時
+        會被就地更新，需要保留合併前內容的呼叫者應自行複製
+        """
+        store = self.store
+        if existing_terms is not store.terms:
+            store.set_terms(existing_terms)
+        wiki_terms_dict, self.merge_stats = store.merge(wiki_terms)
+        for name, value in self.merge_stats._asdict().items():
+            self.metrics.set(f'terms_{name}', value)
+        self.metrics.set('terms_total', len(store.terms))
         # 回傳合併後的內容和這次維基教科書內容（for snapshot）
-        return merged_terms, wiki_terms_dict
-        
+        return store.terms, wiki_terms_dict
+
+    def lint_merged_terms(self, terms_dict):
+        """檢查合併結果中的重複、重疊與刪除詞彙衝突，只記錄問題，不中止流程"""
+        issues = lint_terms(terms_dict.items(), self.store.deleted, traditional_function())
+        errors = [issue for issue in issues if issue.severity == 'error']
+        self.metrics.set('lint_errors', len(errors))
+        self.metrics.set('lint_warnings', len(issues) - len(errors))
+        for issue in errors:
+            logger.warning(f"術語檢查錯誤 {issue.check} {issue.cn}: {issue.detail}")
+        if issues:
+            detail = '，'.join(f'{check} {n}' for check, n in summarize(issues).items())
+            logger.info(f"術語檢查：錯誤 {len(errors)} 個，警告 {len(issues) - len(errors)} 個（{detail}）")
+        return issues
+
     def save_terms(self, terms_dict):
         """儲存術語對照表到 CSV 檔案"""
         try:
-            # 建立備份
-            if os.path.exists(self.terms_file):
-                backup_file = f"{self.terms_file}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                os.rename(self.terms_file, backup_file)
-                logger.info(f"建立備份: {backup_file}")
-            
-            # 寫入新的 CSV 檔案
-            with open(self.terms_file, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['cn', 'tw'])
-                
-                # 按中文術語排序
-                sorted_terms = sorted(terms_dict.items(), key=lambda x: x[0])
-                for cn_term, tw_term in sorted_terms:
-                    writer.writerow([cn_term, tw_term])
-                    
+            with TermHistory(self.history_file) as history:
+                # 建立備份：寫入前的內容若與最新版本相同則不重複儲存
+                if os.path.exists(self.terms_file):
+                    version, added = history.record(self.terms_file)
+                    if added:
+                        logger.info(f"建立備份: 版本 {version.id}（{self.history_file}）")
+
+                # 寫入新的 CSV 檔案（按中文術語排序）
+                write_terms_csv(self.terms_file, terms_dict)
+
+                version, added = history.record(self.terms_file)
+                pruned = history.prune(self.terms_file, keep=self.history_keep)
+                if added:
+                    logger.info(f"記錄版本 {version.id}，刪除 {pruned} 個過期版本")
+
             logger.info(f"成功儲存 {len(terms_dict)} 個術語到 {self.terms_file}")
             return True
             
@@ -285,42 +516,128 @@ class WikiTermsScraper:
             return False
             
     def run(self):
-        """執行完整的爬取和更新流程（詞彙級合併）"""
+        """執行完整的爬取和更新流程（詞彙級合併），各階段的耗時與計數記錄在 self.metrics"""
+        success = self._run()
+        self.metrics.success = success
+        return success
+
+    def _run(self):
+        metrics = self.metrics
         logger.info("開始執行術語對照表更新流程（詞彙級合併）")
         
-        # 取得維基教科書頁面
-        html_content = self.fetch_wiki_page()
-        if not html_content:
-            logger.error("無法取得維基教科書頁面，流程終止")
-            return False
-            
-        # 解析術語對照表
-        wiki_terms = self.parse_terms_table(html_content)
-        if not wiki_terms:
-            logger.error("無法解析術語對照表，流程終止")
+        # 並行取得所有來源頁面
+        with metrics.stage('fetch'):
+            results = self.fetch_sources()
+        metrics.set('sources', len(results))
+        metrics.set('bytes_fetched', sum(r.nbytes for r in results))
+        metrics.set('page_unchanged', int(self.page_unchanged))
+        if self.page_unchanged:
+            logger.info("維基教科書頁面未變更，略過解析與合併")
+            return True
+        failed = [r.source.name for r in results if r.html is None]
+        if failed:
+            logger.error(f"無法取得維基教科書頁面（{', '.join(failed)}），流程終止")
             return False
+        return self._update_from(results)
+
+    def merge_pages(self, paths):
+        """以已下載的頁面檔案取代連網取得，執行解析之後的合併流程"""
+        results = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                html_content = f.read()
+            results.append(FetchResult(Source(os.path.basename(path), path), html_content, None, False,
+                                       len(html_content.encode('utf-8'))))
+        self.metrics.set('sources', len(results))
+        self.metrics.set('bytes_fetched', 0)
+        success = self._update_from(results)
+        self.metrics.success = success
+        return success
+
+    def _update_from(self, results):
+        """解析、合併、檢查並寫入已取得的頁面"""
+        metrics = self.metrics
+        
+        # 解析術語對照表，依來源順序串接，合併結果與完成順序無關
+        wiki_terms = []
+        with metrics.stage('parse'):
+            for result in results:
+                source_terms = self.parse_terms_table(result.html, result.source)
+                if not source_terms:
+                    logger.error(f"無法解析術語對照表（{result.source.name}），流程終止")
+                    return False
+                wiki_terms.extend(source_terms)
+        metrics.set('rows_parsed', len(wiki_terms))
             
         # 載入現有術語
-        existing_terms = self.load_existing_terms()
+        with metrics.stage('load'):
+            existing_terms = self.load_existing_terms()
         
         # 合併術語
-        merged_terms, wiki_terms_dict = self.merge_terms(wiki_terms, existing_terms)
+        with metrics.stage('merge'):
+            merged_terms, wiki_terms_dict = self.merge_terms(wiki_terms, existing_terms)
+        
+        # 檢查合併結果
+        with metrics.stage('lint'):
+            self.lint_merged_terms(merged_terms)
         
         # 儲存術語
-        success = self.save_terms(merged_terms)
+        with metrics.stage('save'):
+            success = self.save_terms(merged_terms)
         
         if success:
-            self.save_wiki_snapshot(wiki_terms_dict)
+            with metrics.stage('snapshot'):
+                self.save_wiki_snapshot(wiki_terms_dict)
+                self.save_wiki_meta()
             logger.info("術語對照表更新完成（詞彙級合併）")
         else:
             logger.error("術語對照表更新失敗")
             
         return success
 
+def merge_main():
+    """以已下載的頁面更新術語對照表，不需連網"""
+    parser = argparse.ArgumentParser(description='以已下載的維基教科書頁面更新術語對照表。')
+    parser.add_argument('pages', nargs='+', help='頁面 HTML 檔案，依序合併')
+    parser.add_argument('--verbose', '-v', action='store_true', help='輸出逐詞的合併記錄')
+    parser.add_argument('--metrics-json', default=None, help='將各階段耗時與計數寫成 JSON 記錄')
+    args = parser.parse_args()
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    scraper = WikiTermsScraper()
+    try:
+        success = scraper.merge_pages(args.pages)
+    finally:
+        if args.metrics_json:
+            scraper.metrics.write_json(args.metrics_json)
+    if not success:
+        exit(1)
+
 def main():
     """主函式"""
+    parser = argparse.ArgumentParser(description='從維基教科書更新術語對照表。')
+    parser.add_argument('--verbose', '-v', action='store_true', help='輸出逐詞的合併記錄')
+    parser.add_argument('--sources', default=None, help='來源設定 JSON，未指定時只取得維基教科書對照表')
+    parser.add_argument('--metrics-json', default=None, help='將各階段耗時與計數寫成 JSON 記錄')
+    parser.add_argument('--metrics-prom', default=None, help='將各階段耗時與計數寫成 Prometheus textfile')
+    args = parser.parse_args()
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
     scraper = WikiTermsScraper()
-    success = scraper.run()
+    if args.sources:
+        try:
+            scraper.sources = load_sources(args.sources)
+        except ValueError as e:
+            parser.error(str(e))
+    try:
+        success = scraper.run()
+    finally:
+        if args.metrics_json:
+            scraper.metrics.write_json(args.metrics_json)
+        if args.metrics_prom:
+            scraper.metrics.write_prometheus(args.metrics_prom)
     
     if not success:
         exit(1)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地術語轉換引擎
+將 terms.csv 編譯為 Aho-Corasick 自動機，以單次掃描、最左最長比對的方式轉換文本，不需經過 LLM
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque, namedtuple
+from functools import lru_cache
+
+TERMS_FILE = 'terms.csv'
+# cn2tw：中國大陸用語 → 台灣用語；tw2cn：台灣用語 → 中國大陸用語
+DIRECTIONS = ('cn2tw', 'tw2cn')
+
+# 一個比對結果：start/end 為原文位置，out_start/out_end 為輸出文本位置
+# target 為實際替換的詞，alternatives 為 terms.csv 中以分號分隔的所有候選詞
+Match = namedtuple('Match', ['start', 'end', 'out_start', 'out_end', 'source', 'target', 'alternatives'])
+
+
+def split_alternatives(tw):
+    """拆分以分號分隔的台灣用語，保留原順序並去除重複"""
+    result = []
+    for t in tw.split(';'):
+        t = t.strip()
+        if t and t not in result:
+            result.append(t)
+    return tuple(result)
+
+
+def terms_from_rows(rows):
+    """由 [(cn, tw), ...] 建立 {cn: tw}，略過 cn 或 tw 為空的列"""
+    return {cn: tw for cn, tw in rows if cn and tw}
+
+
+def load_terms(terms_file=TERMS_FILE):
+    """讀取 terms.csv，回傳 {cn: tw}"""
+    with open(terms_file, 'r', encoding='utf-8') as f:
+        return terms_from_rows((row['cn'], row['tw']) for row in csv.DictReader(f))
+
+
+def reverse_terms(terms):
+    """由 {cn: tw} 建立反向索引 {台灣用語: 以分號分隔的候選 cn}
+
+    同一個台灣用語常出現在多個 cn 之下（例如「內建」同時對應「内建」與「内置」），
+    候選詞依該台灣用語在各 cn 候選中的順位排序，列為首選者在前，順位相同時依 cn 排序
+    """
+    candidates = {}
+    for cn in sorted(terms):
+        for rank, tw in enumerate(split_alternatives(terms[cn])):
+            candidates.setdefault(tw, []).append((rank, cn))
+    return {tw: ';'.join(cn for _, cn in sorted(entries)) for tw, entries in candidates.items()}
+
+
+def load_direction_terms(terms_file=TERMS_FILE, direction='cn2tw'):
+    """依轉換方向讀取 {來源詞: 以分號分隔的目標詞}"""
+    if direction not in DIRECTIONS:
+        raise ValueError(f'不支援的轉換方向: {direction}')
+    terms = load_terms(terms_file)
+    return reverse_terms(terms) if direction == 'tw2cn' else terms
+
+
+class AhoCorasick:
+    """多模式字串比對自動機，每個狀態以 dict 儲存轉移"""
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [-1]      # 在此狀態結束的詞索引，-1 表示無
+        self.dict_link = [0]    # 沿失敗連結最近一個有輸出的狀態，0 表示無
+        self.alphabet = set()
+        self.max_len = 0
+        for index, key in enumerate(self.keys):
+            self._insert(key, index)
+        self.lengths = [len(key) for key in self.keys]
+        self._build_links()
+
+    def _insert(self, key, index):
+        state = 0
+        for ch in key:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(-1)
+                self.dict_link.append(0)
+                self.goto[state][ch] = nxt
+            state = nxt
+        self.output[state] = index
+        self.alphabet.update(key)
+        self.max_len = max(self.max_len, len(key))
+
+    def _build_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                link = self.fail[nxt]
+                self.dict_link[nxt] = link if self.output[link] >= 0 else self.dict_link[link]
+
+    def iter_matches(self, text):
+        """逐一產生所有（可重疊的）比對結果 (start, end, key_index)"""
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        lengths, alphabet = self.lengths, self.alphabet
+        state = 0
+        for pos, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            s = state if output[state] >= 0 else dict_link[state]
+            while s:
+                index = output[s]
+                yield pos + 1 - lengths[index], pos + 1, index
+                s = dict_link[s]
+
+    def matched_keys(self, text):
+        """回傳文本中出現過的詞索引 set，只需知道是否出現時比 iter_matches 快"""
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        alphabet = self.alphabet
+        found = set()
+        visited = set()  # 已收集過輸出鏈的狀態不必再走一次
+        state = 0
+        for ch in text:
+            if ch not in alphabet:
+                state = 0
+                continue
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if state in visited:
+                continue
+            visited.add(state)
+            s = state if output[state] >= 0 else dict_link[state]
+            while s:
+                found.add(output[s])
+                s = dict_link[s]
+        return found
+
+    def longest_at(self, text):
+        """回傳 {start: (end, key_index)}，每個起點只保留最長的比對"""
+        # 與 iter_matches 相同的掃描，內聯以避免產生器的額外成本
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        lengths, alphabet = self.lengths, self.alphabet
+        best = {}
+        state = 0
+        for pos, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            s = state if output[state] >= 0 else dict_link[state]
+            while s:
+                # 同一起點較晚結束的比對一定較長，直接覆蓋即可
+                index = output[s]
+                best[pos + 1 - lengths[index]] = (pos + 1, index)
+                s = dict_link[s]
+        return best
+
+
+def select_leftmost_longest(best):
+    """由 longest_at 的結果由左至右挑出不重疊的比對 [(start, end, key_index), ...]"""
+    selected = []
+    pos = 0
+    for start in sorted(best):
+        if start < pos:
+            continue
+        end, index = best[start]
+        selected.append((start, end, index))
+        pos = end
+    return selected
+
+
+class TermConverter:
+    """以最左最長比對將中國大陸用語轉換為台灣用語；以 reverse_terms 建立時則反向轉換"""
+
+    def __init__(self, terms):
+        self.sources = sorted(terms)
+        self.targets = [split_alternatives(terms[cn]) for cn in self.sources]
+        self.automaton = AhoCorasick(self.sources)
+
+    @classmethod
+    def from_csv(cls, terms_file=TERMS_FILE, direction='cn2tw'):
+        return cls(load_direction_terms(terms_file, direction))
+
+    @classmethod
+    def from_dictionary(cls, dictionary):
+        """直接使用 mmap 載入的二進位字典（見 term_dict.py），不建立 Python 字串表"""
+        converter = cls.__new__(cls)
+        converter.sources = dictionary.sources
+        converter.targets = dictionary.targets
+        converter.automaton = dictionary.automaton
+        return converter
+
+    def find_matches(self, text):
+        """回傳不重疊的最左最長比對 [(start, end, key_index), ...]"""
+        return select_leftmost_longest(self.automaton.longest_at(text))
+
+    def convert_with_spans(self, text):
+        """轉換文本，並回傳每個比對的位置與候選詞"""
+        pieces = []
+        matches = []
+        pos = 0
+        out_pos = 0
+        for start, end, index in self.find_matches(text):
+            if start > pos:
+                pieces.append(text[pos:start])
+                out_pos += start - pos
+            alternatives = self.targets[index]
+            target = alternatives[0]
+            pieces.append(target)
+            matches.append(Match(start, end, out_pos, out_pos + len(target),
+                                 self.sources[index], target, alternatives))
+            out_pos += len(target)
+            pos = end
+        pieces.append(text[pos:])
+        return ''.join(pieces), matches
+
+    def convert(self, text):
+        """轉換文本，同一詞有多個台灣用語時採用第一個"""
+        return self.convert_with_spans(text)[0]
+
+    def convert_with_keys(self, text):
+        """轉換文本，並回傳實際替換過的來源詞 set，供增量轉換判斷字典變更影響哪些文件"""
+        pieces = []
+        used = set()
+        pos = 0
+        targets = self.targets
+        for start, end, index in self.find_matches(text):
+            pieces.append(text[pos:start])
+            pieces.append(targets[index][0])
+            used.add(index)
+            pos = end
+        pieces.append(text[pos:])
+        return ''.join(pieces), {self.sources[index] for index in used}
+
+
+@lru_cache(maxsize=None)
+def load_converter(terms_file=TERMS_FILE, packed=False, direction='cn2tw'):
+    """載入並快取編譯好的轉換器；packed 為 True 時改用 mmap 的二進位字典"""
+    if packed:
+        from term_dict import load_dictionary
+        return TermConverter.from_dictionary(load_dictionary(terms_file, direction=direction))
+    return TermConverter.from_csv(terms_file, direction)
+
+
+def convert(text, terms_file=TERMS_FILE, direction='cn2tw'):
+    """以 terms.csv 轉換文本"""
+    return load_converter(terms_file, direction=direction).convert(text)
+
+
+def convert_with_spans(text, terms_file=TERMS_FILE, direction='cn2tw'):
+    """以 terms.csv 轉換文本，並回傳比對位置"""
+    return load_converter(terms_file, direction=direction).convert_with_spans(text)
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='以 terms.csv 在本地轉換中國大陸技術術語。')
+    parser.add_argument('files', nargs='*', help='要轉換的檔案，未指定時讀取標準輸入')
+    parser.add_argument('--terms', '-t', default=TERMS_FILE, help='術語對照表路徑')
+    parser.add_argument('--spans', action='store_true', help='以 JSON 輸出轉換結果與有多個候選詞的比對位置')
+    parser.add_argument('--packed', action='store_true', help='使用 mmap 的二進位字典（見 term_dict.py），內容變更時自動重建')
+    parser.add_argument('--reverse', '-r', action='store_true', help='反向轉換：台灣用語 → 中國大陸用語')
+    parser.add_argument('--markdown', '-m', action='store_true',
+                        help='只轉換 Markdown 內文，保留程式碼、連結目標、網址與 HTML 標籤（見 markdown_convert.py）')
+    args = parser.parse_args()
+    if args.markdown and args.spans:
+        parser.error('--markdown 不支援 --spans，位元組位置對應請使用 markdown_convert.py --source-map')
+
+    if not os.path.exists(args.terms):
+        print(f'找不到術語對照表：{args.terms}', file=sys.stderr)
+        sys.exit(1)
+    converter = load_converter(args.terms, packed=args.packed, direction='tw2cn' if args.reverse else 'cn2tw')
+    if args.markdown:
+        from markdown_convert import MarkdownConverter
+        converter = MarkdownConverter(converter)
+
+    sources = args.files or ['-']
+    for path in sources:
+        if path == '-':
+            text = sys.stdin.read()
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        if not args.spans:
+            sys.stdout.write(converter.convert(text))
+            continue
+        converted, matches = converter.convert_with_spans(text)
+        ambiguous = [m._asdict() for m in matches if len(m.alternatives) > 1]
+        record = {'file': path, 'text': converted, 'ambiguous': ambiguous}
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
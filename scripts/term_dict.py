@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+預先編譯的二進位術語字典
+將 terms.csv 編譯為帶版本的緊湊二進位檔（排序後的字串池、位移陣列與預建的比對自動機），
+載入時以 mmap 零複製讀取，多個行程可共用同一份分頁
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+
+from term_converter import TERMS_FILE, AhoCorasick, load_direction_terms, split_alternatives
+
+MAGIC = b'TWTD'
+FORMAT_VERSION = 1
+DICT_SUFFIX = '.tdict'
+
+# 各區段依序存放，皆以 8 位元組對齊；反向字典（tw2cn）的 cn_* 存放台灣用語、tw_* 存放候選 cn
+SECTIONS = [
+    'cn_offsets',     # u32[n_terms + 1]，cn_pool 中每個詞的起訖
+    'cn_pool',        # 依 cn 排序後串接的 UTF-8 位元組
+    'tw_offsets',     # u32[n_terms + 1]
+    'tw_pool',        # 與 cn 同順序的 tw 原始字串
+    'key_lengths',    # u32[n_terms]，cn 的字元數
+    'trans_start',    # u32[n_states + 1]，每個狀態的轉移在 trans_* 中的範圍
+    'trans_chars',    # u32[n_trans]，各狀態內依碼位排序
+    'trans_next',     # u32[n_trans]
+    'fail',           # u32[n_states]
+    'output',         # i32[n_states]，-1 表示無輸出
+    'dict_link',      # u32[n_states]
+    'alphabet',       # u32[]，所有詞用到的字元碼位
+]
+ARRAY_TYPES = {
+    'cn_offsets': 'I', 'tw_offsets': 'I', 'key_lengths': 'I', 'trans_start': 'I',
+    'trans_chars': 'I', 'trans_next': 'I', 'fail': 'I', 'output': 'i', 'dict_link': 'I',
+    'alphabet': 'I',
+}
+# magic、版本、位元組序、來源 SHA-256、詞數、狀態數、轉移數、最長詞長度
+HEADER = struct.Struct('<4sHH32sIIII')
+SECTION_ENTRY = struct.Struct('<QQ')
+BYTE_ORDER = 1 if sys.byteorder == 'little' else 2
+
+
+def dict_path_for(terms_file, direction='cn2tw'):
+    """回傳 terms.csv 對應的二進位字典路徑，反向字典為 terms.tw2cn.tdict"""
+    base = os.path.splitext(terms_file)[0]
+    return base + (DICT_SUFFIX if direction == 'cn2tw' else f'.{direction}{DICT_SUFFIX}')
+
+
+def file_digest(path, direction='cn2tw'):
+    """計算檔案內容的 SHA-256；反向字典另加上方向，兩個方向的版本不會相同"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    if direction != 'cn2tw':
+        content += f'\0{direction}'.encode('ascii')
+    return hashlib.sha256(content).digest()
+
+
+def _pack_strings(strings):
+    offsets = array('I', [0])
+    pool = bytearray()
+    for s in strings:
+        pool += s.encode('utf-8')
+        offsets.append(len(pool))
+    return offsets, bytes(pool)
+
+
+def build_dictionary(terms_file=TERMS_FILE, dict_file=None, direction='cn2tw'):
+    """將 terms.csv 編譯為二進位字典，以暫存檔加上 rename 原子性地取代舊檔"""
+    dict_file = dict_file or dict_path_for(terms_file, direction)
+    digest = file_digest(terms_file, direction)
+    terms = load_direction_terms(terms_file, direction)
+    sources = sorted(terms)
+    automaton = AhoCorasick(sources)
+
+    trans_start = array('I', [0])
+    trans_chars = array('I')
+    trans_next = array('I')
+    for transitions in automaton.goto:
+        for ch in sorted(transitions):
+            trans_chars.append(ord(ch))
+            trans_next.append(transitions[ch])
+        trans_start.append(len(trans_chars))
+
+    cn_offsets, cn_pool = _pack_strings(sources)
+    tw_offsets, tw_pool = _pack_strings(terms[cn] for cn in sources)
+    data = {
+        'cn_offsets': cn_offsets.tobytes(),
+        'cn_pool': cn_pool,
+        'tw_offsets': tw_offsets.tobytes(),
+        'tw_pool': tw_pool,
+        'key_lengths': array('I', automaton.lengths).tobytes(),
+        'trans_start': trans_start.tobytes(),
+        'trans_chars': trans_chars.tobytes(),
+        'trans_next': trans_next.tobytes(),
+        'fail': array('I', automaton.fail).tobytes(),
+        'output': array('i', automaton.output).tobytes(),
+        'dict_link': array('I', automaton.dict_link).tobytes(),
+        'alphabet': array('I', sorted(ord(ch) for ch in automaton.alphabet)).tobytes(),
+    }
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER, digest,
+                         len(sources), len(automaton.goto), len(trans_chars), automaton.max_len)
+    offset = _align(HEADER.size + SECTION_ENTRY.size * len(SECTIONS))
+    directory = []
+    for name in SECTIONS:
+        directory.append((offset, len(data[name])))
+        offset = _align(offset + len(data[name]))
+
+    target_dir = os.path.dirname(os.path.abspath(dict_file))
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix='.tdict.')
+    try:
+        os.chmod(tmp_path, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            for entry in directory:
+                f.write(SECTION_ENTRY.pack(*entry))
+            for name, (start, _length) in zip(SECTIONS, directory):
+                f.write(b'\0' * (start - f.tell()))
+                f.write(data[name])
+        os.replace(tmp_path, dict_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return dict_file
+
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class _StringPool:
+    """以位移陣列在字串池中取出字串，僅在存取時解碼，常用的詞快取在 MEMO_LIMIT 以內"""
+
+    MEMO_LIMIT = 1 << 16
+
+    def __init__(self, offsets, pool):
+        self._offsets = offsets
+        self._pool = pool
+        self._size = len(offsets) - 1
+        self._memo = {}
+
+    def __len__(self):
+        return self._size
+
+    def _decode(self, index):
+        return str(self._pool[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def __getitem__(self, index):
+        value = self._memo.get(index)
+        if value is not None:
+            return value
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        if len(self._memo) >= self.MEMO_LIMIT:
+            self._memo.clear()
+        value = self._memo[index] = self._decode(index)
+        return value
+
+
+class _TargetPool(_StringPool):
+    """存取時才拆分分號分隔的台灣用語"""
+
+    def _decode(self, index):
+        return split_alternatives(super()._decode(index))
+
+
+class PackedAutomaton:
+    """直接在 mmap 的陣列上執行的 Aho-Corasick 自動機，介面與 AhoCorasick 相同"""
+
+    MEMO_LIMIT = 1 << 16
+
+    def __init__(self, sections, max_len):
+        self.lengths = sections['key_lengths']
+        self.trans_start = sections['trans_start']
+        self.trans_chars = sections['trans_chars']
+        self.trans_next = sections['trans_next']
+        self.fail = sections['fail']
+        self.output = sections['output']
+        self.dict_link = sections['dict_link']
+        self.max_len = max_len
+        # 根節點轉移與字元集合只與不同字元數有關，不隨詞數成長
+        self.root = {chr(self.trans_chars[i]): self.trans_next[i]
+                     for i in range(self.trans_start[0], self.trans_start[1])}
+        self.alphabet = frozenset(map(chr, sections['alphabet']))
+        self._memo = {}
+        self._emit_memo = {}
+
+    def _step(self, state, ch):
+        if not state:
+            return self.root.get(ch, 0)
+        cp = ord(ch)
+        trans_start, trans_chars, trans_next, fail = self.trans_start, self.trans_chars, self.trans_next, self.fail
+        while state:
+            lo, hi = trans_start[state], trans_start[state + 1]
+            if lo < hi:
+                i = bisect_left(trans_chars, cp, lo, hi)
+                if i < hi and trans_chars[i] == cp:
+                    return trans_next[i]
+            state = fail[state]
+        return self.root.get(ch, 0)
+
+    def _transitions(self, state):
+        """回傳狀態的轉移表；實際走過的狀態才會快取為 dict，數量受 MEMO_LIMIT 限制"""
+        row = self._memo.get(state)
+        if row is None:
+            if len(self._memo) >= self.MEMO_LIMIT:
+                self._memo.clear()
+            row = self._memo[state] = {}
+        return row
+
+    def iter_matches(self, text):
+        """逐一產生所有（可重疊的）比對結果 (start, end, key_index)"""
+        output, dict_link, lengths, alphabet = self.output, self.dict_link, self.lengths, self.alphabet
+        transitions, step = self._transitions, self._step
+        state = 0
+        for pos, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            row = transitions(state)
+            nxt = row.get(ch)
+            if nxt is None:
+                nxt = row[ch] = step(state, ch)
+            state = nxt
+            s = state if output[state] >= 0 else dict_link[state]
+            while s:
+                index = output[s]
+                yield pos + 1 - lengths[index], pos + 1, index
+                s = dict_link[s]
+
+    def _emits(self, state):
+        """回傳狀態沿字典連結的所有輸出 ((長度, 詞索引), ...)"""
+        output, dict_link, lengths = self.output, self.dict_link, self.lengths
+        result = []
+        s = state if output[state] >= 0 else dict_link[state]
+        while s:
+            index = output[s]
+            result.append((lengths[index], index))
+            s = dict_link[s]
+        return tuple(result)
+
+    def longest_at(self, text):
+        """回傳 {start: (end, key_index)}，每個起點只保留最長的比對"""
+        # 與 iter_matches 相同的掃描，但把每個狀態的輸出也一併快取，避免反覆讀取 mmap 陣列
+        alphabet, transitions, step, emits = self.alphabet, self._transitions, self._step, self._emits
+        emit_memo = self._emit_memo
+        best = {}
+        state = 0
+        for pos, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            row = transitions(state)
+            nxt = row.get(ch)
+            if nxt is None:
+                nxt = row[ch] = step(state, ch)
+            state = nxt
+            found = emit_memo.get(state)
+            if found is None:
+                if len(emit_memo) >= self.MEMO_LIMIT:
+                    emit_memo.clear()
+                found = emit_memo[state] = emits(state)
+            for length, index in found:
+                best[pos + 1 - length] = (pos + 1, index)
+        return best
+
+
+class PackedDictionary:
+    """以 mmap 載入的二進位字典"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, byte_order, digest, n_terms, n_states, n_trans, max_len = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != BYTE_ORDER:
+            raise ValueError(f'不支援的字典格式: {path}')
+        self.digest = digest
+        self.n_terms = n_terms
+        self.n_states = n_states
+        self.n_trans = n_trans
+
+        sections = {}
+        for i, name in enumerate(SECTIONS):
+            start, length = SECTION_ENTRY.unpack_from(view, HEADER.size + SECTION_ENTRY.size * i)
+            section = view[start:start + length]
+            sections[name] = section.cast(ARRAY_TYPES[name]) if name in ARRAY_TYPES else section
+        self.sources = _StringPool(sections['cn_offsets'], sections['cn_pool'])
+        self.raw_targets = _StringPool(sections['tw_offsets'], sections['tw_pool'])
+        self.targets = _TargetPool(sections['tw_offsets'], sections['tw_pool'])
+        self.automaton = PackedAutomaton(sections, max_len)
+
+    @property
+    def version(self):
+        """字典版本：來源 terms.csv 內容的 SHA-256"""
+        return self.digest.hex()
+
+    def __len__(self):
+        return self.n_terms
+
+    def _index(self, cn):
+        sources = self.sources
+        lo, hi = 0, len(sources)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if sources[mid] < cn:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(sources) and sources[lo] == cn:
+            return lo
+        return -1
+
+    def __contains__(self, cn):
+        return self._index(cn) >= 0
+
+    def get(self, cn, default=None):
+        """以二分搜尋查詢 cn 對應的 tw 原始字串"""
+        index = self._index(cn)
+        return self.raw_targets[index] if index >= 0 else default
+
+    def items(self):
+        for index in range(self.n_terms):
+            yield self.sources[index], self.raw_targets[index]
+
+
+def load_dictionary(terms_file=TERMS_FILE, dict_file=None, direction='cn2tw'):
+    """載入二進位字典；不存在、格式不符或 terms.csv 內容雜湊不同時自動重建"""
+    dict_file = dict_file or dict_path_for(terms_file, direction)
+    digest = file_digest(terms_file, direction)
+    if os.path.exists(dict_file):
+        try:
+            dictionary = PackedDictionary(dict_file)
+            if dictionary.digest == digest:
+                return dictionary
+        except (ValueError, struct.error):
+            pass
+    build_dictionary(terms_file, dict_file, direction)
+    return PackedDictionary(dict_file)
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='將 terms.csv 編譯為二進位術語字典。')
+    parser.add_argument('--terms', '-t', default=TERMS_FILE, help='術語對照表路徑')
+    parser.add_argument('--output', '-o', default=None, help='輸出路徑（預設為 terms.tdict）')
+    parser.add_argument('--reverse', '-r', action='store_true', help='編譯台灣用語 → 中國大陸用語的反向字典（預設為 terms.tw2cn.tdict）')
+    args = parser.parse_args()
+
+    dict_file = build_dictionary(args.terms, args.output, 'tw2cn' if args.reverse else 'cn2tw')
+    dictionary = PackedDictionary(dict_file)
+    print(f'已編譯 {len(dictionary)} 個術語到 {dict_file}（版本 {dictionary.version[:12]}）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+術語表版本記錄
+以 SQLite 保存 terms.csv 的歷史版本：內容以雜湊值為鍵壓縮儲存，相同內容只存一份，
+取代每次執行都複製一份 terms.csv.backup.* 的備份方式，並提供保留政策、還原與比較
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+TERMS_FILE = 'terms.csv'
+HISTORY_FILE = 'terms_history.sqlite'
+DEFAULT_KEEP = 100  # 預設保留的版本數
+
+Version = namedtuple('Version', ['id', 'path', 'hash', 'size', 'created_at'])
+TermsDiff = namedtuple('TermsDiff', ['added', 'removed', 'changed'])
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_path ON versions(path, id);
+'''
+
+
+def parse_terms(content):
+    """將 terms.csv 內容解析為 {cn: tw}"""
+    return {row['cn']: row['tw'] for row in csv.DictReader(io.StringIO(content.decode('utf-8')))}
+
+
+class TermHistory:
+    """terms.csv 的版本記錄"""
+
+    def __init__(self, db_file=HISTORY_FILE):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def latest(self, path=TERMS_FILE):
+        """回傳指定檔案最新的版本，沒有記錄時回傳 None"""
+        row = self.conn.execute(
+            'SELECT v.id, v.path, v.hash, b.size, v.created_at FROM versions v JOIN blobs b ON b.hash = v.hash '
+            'WHERE v.path = ? ORDER BY v.id DESC LIMIT 1', (path,)).fetchone()
+        return Version(*row) if row else None
+
+    def record(self, path=TERMS_FILE, content=None):
+        """記錄檔案目前的內容；與最新版本相同時不新增，回傳 (Version, 是否新增)"""
+        if content is None:
+            with open(path, 'rb') as f:
+                content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        latest = self.latest(path)
+        if latest and latest.hash == digest:
+            return latest, False
+        created_at = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO blobs (hash, size, data) VALUES (?, ?, ?)',
+                              (digest, len(content), zlib.compress(content, 9)))
+            cursor = self.conn.execute('INSERT INTO versions (path, hash, created_at) VALUES (?, ?, ?)',
+                                       (path, digest, created_at))
+        return Version(cursor.lastrowid, path, digest, len(content), created_at), True
+
+    def versions(self, path=TERMS_FILE):
+        """依新到舊列出版本"""
+        rows = self.conn.execute(
+            'SELECT v.id, v.path, v.hash, b.size, v.created_at FROM versions v JOIN blobs b ON b.hash = v.hash '
+            'WHERE v.path = ? ORDER BY v.id DESC', (path,)).fetchall()
+        return [Version(*row) for row in rows]
+
+    def content(self, version_id):
+        """取出指定版本的原始內容"""
+        row = self.conn.execute('SELECT b.data FROM versions v JOIN blobs b ON b.hash = v.hash WHERE v.id = ?',
+                                (version_id,)).fetchone()
+        if row is None:
+            raise KeyError(f'找不到版本 {version_id}')
+        return zlib.decompress(row[0])
+
+    def restore(self, version_id, dest=None):
+        """將指定版本還原到 dest（預設為原路徑），還原前會先記錄目前內容"""
+        path = self.conn.execute('SELECT path FROM versions WHERE id = ?', (version_id,)).fetchone()
+        if path is None:
+            raise KeyError(f'找不到版本 {version_id}')
+        dest = dest or path[0]
+        if os.path.exists(dest):
+            self.record(dest)
+        with open(dest, 'wb') as f:
+            f.write(self.content(version_id))
+        return dest
+
+    def diff(self, old_id, new_id):
+        """以詞彙比較兩個版本，回傳 TermsDiff(added, removed, changed)"""
+        old_terms = parse_terms(self.content(old_id))
+        new_terms = parse_terms(self.content(new_id))
+        added = {cn: tw for cn, tw in new_terms.items() if cn not in old_terms}
+        removed = {cn: tw for cn, tw in old_terms.items() if cn not in new_terms}
+        changed = {cn: (old_terms[cn], tw) for cn, tw in new_terms.items()
+                   if cn in old_terms and old_terms[cn] != tw}
+        return TermsDiff(added, removed, changed)
+
+    def prune(self, path=TERMS_FILE, keep=DEFAULT_KEEP, days=None):
+        """保留政策：只保留最新 keep 個版本，且（若指定 days）刪除超過 days 天的版本；最新版本一定保留"""
+        versions = self.versions(path)
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds') if days is not None else None
+        doomed = [v.id for i, v in enumerate(versions)
+                  if i > 0 and (i >= keep or (cutoff is not None and v.created_at < cutoff))]
+        if doomed:
+            with self.conn:
+                self.conn.executemany('DELETE FROM versions WHERE id = ?', [(i,) for i in doomed])
+                self.conn.execute('DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM versions)')
+        return len(doomed)
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='管理 terms.csv 的歷史版本。')
+    parser.add_argument('--db', default=HISTORY_FILE, help='版本記錄資料庫路徑')
+    parser.add_argument('--path', default=TERMS_FILE, help='術語對照表路徑')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='列出版本')
+    sub.add_parser('record', help='記錄目前內容')
+    show = sub.add_parser('show', help='輸出指定版本的內容')
+    show.add_argument('version', type=int)
+    restore = sub.add_parser('restore', help='還原指定版本')
+    restore.add_argument('version', type=int)
+    restore.add_argument('--output', '-o', default=None, help='還原到其他路徑')
+    diff = sub.add_parser('diff', help='比較兩個版本')
+    diff.add_argument('old', type=int)
+    diff.add_argument('new', type=int)
+    prune = sub.add_parser('prune', help='依保留政策刪除舊版本')
+    prune.add_argument('--keep', type=int, default=DEFAULT_KEEP, help='保留的版本數')
+    prune.add_argument('--days', type=int, default=None, help='刪除超過此天數的版本')
+    args = parser.parse_args()
+
+    with TermHistory(args.db) as history:
+        if args.command == 'list':
+            for v in history.versions(args.path):
+                print(f"{v.id}\t{v.created_at}\t{v.hash[:12]}\t{v.size} bytes")
+        elif args.command == 'record':
+            version, added = history.record(args.path)
+            print(f"已記錄版本 {version.id}" if added else f"內容未變更，最新版本為 {version.id}")
+        elif args.command == 'show':
+            sys.stdout.write(history.content(args.version).decode('utf-8'))
+        elif args.command == 'restore':
+            dest = history.restore(args.version, args.output)
+            print(f"已將版本 {args.version} 還原到 {dest}")
+        elif args.command == 'diff':
+            result = history.diff(args.old, args.new)
+            for cn, tw in sorted(result.added.items()):
+                print(f"+ {cn} → {tw}")
+            for cn, tw in sorted(result.removed.items()):
+                print(f"- {cn} → {tw}")
+            for cn, (old_tw, new_tw) in sorted(result.changed.items()):
+                print(f"~ {cn} → {old_tw} → {new_tw}")
+        elif args.command == 'prune':
+            print(f"已刪除 {history.prune(args.path, args.keep, args.days)} 個版本")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常駐轉換服務
+在記憶體中保留編譯好的術語索引，以 HTTP（TCP 或 Unix socket）同時服務轉換與精簡 prompt 請求；
+監看 terms.csv，變更時在背景重建索引後原子性地替換，進行中的請求不受影響
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from prompt_subset import PromptSubsetter
+from term_converter import DIRECTIONS, TERMS_FILE, TermConverter, reverse_terms, terms_from_rows
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HOST = '127.0.0.1'
+PORT = 8765
+POLL_INTERVAL = 1.0         # 檢查檔案變更的間隔秒數
+MAX_BODY = 16 << 20         # 請求內容上限
+
+
+class TermIndex:
+    """某一版本術語檔案編譯出的索引，建立後不再修改，可同時供多個請求讀取"""
+
+    def __init__(self, version, converters, subsetters, n_terms, build_seconds):
+        self.version = version
+        self.converters = converters    # 方向 → TermConverter
+        self.subsetters = subsetters    # 方向 → PromptSubsetter
+        self.n_terms = n_terms
+        self.build_seconds = build_seconds
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+
+    @classmethod
+    def build(cls, terms_file=TERMS_FILE):
+        """只讀取 terms.csv 一次，版本與所有索引都來自同一份內容，讀取期間的寫入不會造成版本與內容不符"""
+        start = time.perf_counter()
+        with open(terms_file, 'rb') as f:
+            data = f.read()
+        version = hashlib.sha256(data).hexdigest()[:16]
+        rows = [(row['cn'], row['tw']) for row in csv.DictReader(io.StringIO(data.decode('utf-8')))]
+        terms = terms_from_rows(rows)
+        converters = {'cn2tw': TermConverter(terms), 'tw2cn': TermConverter(reverse_terms(terms))}
+        subsetters = {direction: PromptSubsetter(rows, direction) for direction in DIRECTIONS}
+        return cls(version, converters, subsetters, len(terms), time.perf_counter() - start)
+
+
+class LatencyStats:
+    """各端點的請求數、錯誤數與最近 WINDOW 次的延遲分布"""
+
+    WINDOW = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = {'count': 0, 'errors': 0, 'total': 0.0, 'max': 0.0,
+                                                     'recent': deque(maxlen=self.WINDOW)}
+            entry['count'] += 1
+            entry['errors'] += int(error)
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['recent'].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            entries = {name: dict(entry, recent=sorted(entry['recent'])) for name, entry in self._endpoints.items()}
+        result = {}
+        for name, entry in entries.items():
+            recent = entry['recent']
+
+            def percentile(p):
+                return round(recent[min(len(recent) - 1, int(len(recent) * p))] * 1000, 3) if recent else 0.0
+
+            result[name] = {
+                'count': entry['count'],
+                'errors': entry['errors'],
+                'mean_ms': round(entry['total'] / entry['count'] * 1000, 3),
+                'p50_ms': percentile(0.50),
+                'p95_ms': percentile(0.95),
+                'p99_ms': percentile(0.99),
+                'max_ms': round(entry['max'] * 1000, 3),
+            }
+        return result
+
+
+class TermService:
+    """持有目前的索引並監看術語檔案；請求處理只讀取一次 self.index，替換時不需鎖定"""
+
+    def __init__(self, terms_file=TERMS_FILE, interval=POLL_INTERVAL):
+        self.terms_file = terms_file
+        self.interval = interval
+        self.started_at = time.time()
+        self.stats = LatencyStats()
+        self.reloads = 0
+        self.reload_errors = 0
+        self._stamp = self._file_stamp()
+        self.index = TermIndex.build(terms_file)
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def _file_stamp(self):
+        """terms.csv 的 (inode, 大小, 修改時間)；以 rename 取代的寫入也會改變 inode
+
+        索引只由 terms.csv 建立，deleted_terms.txt 的變更不影響轉換結果，不需監看
+        """
+        try:
+            st = os.stat(self.terms_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def check_reload(self):
+        """檔案有變更時重建索引並替換，回傳是否替換了索引；重建失敗時保留舊索引"""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            index = TermIndex.build(self.terms_file)
+        except Exception as e:
+            self.reload_errors += 1
+            logger.error(f"重建術語索引失敗，繼續使用版本 {self.index.version}: {e}")
+            return False
+        if index.version == self.index.version:
+            return False
+        self.index = index
+        self.reloads += 1
+        logger.info(f"已載入術語索引版本 {index.version}（{index.n_terms} 個術語，{index.build_seconds:.3f} 秒）")
+        return True
+
+    def start_watcher(self):
+        def watch():
+            while not self._stop.wait(self.interval):
+                self.check_reload()
+
+        self._watcher = threading.Thread(target=watch, name='terms-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    @staticmethod
+    def _direction(payload):
+        direction = payload.get('direction', 'cn2tw')
+        if direction not in DIRECTIONS:
+            raise ValueError(f'不支援的轉換方向: {direction}')
+        return direction
+
+    def convert(self, payload):
+        index = self.index
+        direction = self._direction(payload)
+        converter = index.converters[direction]
+        result = {'version': index.version}
+        if payload.get('spans'):
+            result['text'], matches = converter.convert_with_spans(payload['text'])
+            result['matches'] = [m._asdict() for m in matches]
+        else:
+            result['text'] = converter.convert(payload['text'])
+        return result
+
+    def prompt(self, payload):
+        index = self.index
+        subsetter = index.subsetters[self._direction(payload)]
+        text = payload['text']
+        full = bool(payload.get('full'))
+        return {
+            'version': index.version,
+            'prompt': subsetter.build_prompt(text, full),
+            'terms': len(subsetter.rows) if full else len(subsetter.matching_rows(text)),
+        }
+
+    def describe(self):
+        index = self.index
+        return {
+            'version': index.version,
+            'terms': index.n_terms,
+            'loaded_at': index.loaded_at,
+            'build_seconds': round(index.build_seconds, 6),
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors,
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'endpoints': self.stats.snapshot(),
+        }
+
+
+def make_handler(service):
+    """建立綁定 service 的請求處理類別"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        routes = {'/convert': service.convert, '/prompt': service.prompt}
+
+        def _send_json(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            if self.close_connection:
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/stats':
+                self._send_json(200, service.describe())
+            elif path == '/health':
+                self._send_json(200, {'status': 'ok', 'version': service.index.version})
+            else:
+                self._send_json(404, {'error': f'找不到 {path}'})
+
+        def do_POST(self):
+            path = self.path.split('?')[0]
+            handler = self.routes.get(path)
+            if handler is None:
+                # 未讀取的請求內容會被當成下一個請求解析，不再沿用此連線
+                self.close_connection = True
+                self._send_json(404, {'error': f'找不到 {path}'})
+                return
+            start = time.perf_counter()
+            status = 200
+            body_read = False
+            try:
+                try:
+                    length = int(self.headers.get('Content-Length') or 0)
+                except ValueError:
+                    raise ValueError('Content-Length 格式錯誤')
+                if length < 0:
+                    raise ValueError('Content-Length 不可為負數')
+                if length > MAX_BODY:
+                    raise ValueError('請求內容過大')
+                raw = self.rfile.read(length)
+                body_read = True
+                raw = raw.decode('utf-8')
+                if self.headers.get_content_type() == 'application/json':
+                    payload = json.loads(raw)
+                    if not isinstance(payload, dict) or not isinstance(payload.get('text'), str):
+                        raise ValueError('需要 {"text": "..."}')
+                else:
+                    # 純文字內容，方向以查詢參數指定，例如 /convert?direction=tw2cn
+                    query = parse_qs(urlsplit(self.path).query)
+                    payload = {'text': raw, 'direction': query.get('direction', ['cn2tw'])[0]}
+                result = handler(payload)
+            except (ValueError, UnicodeDecodeError) as e:
+                status = 400
+                result = {'error': str(e)}
+            except Exception:
+                logger.exception(f"處理 {path} 請求失敗")
+                status = 500
+                result = {'error': '內部錯誤'}
+            if not body_read:
+                self.close_connection = True
+            self._send_json(status, result)
+            service.stats.record(path, time.perf_counter() - start, error=status != 200)
+
+        def address_string(self):
+            # Unix socket 沒有用戶端位址
+            return self.client_address[0] if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host=HOST, port=PORT, unix_socket=None):
+    """建立 HTTP 伺服器；指定 unix_socket 時改以 Unix socket 提供服務"""
+    handler = make_handler(service)
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='常駐的術語轉換服務，術語檔案變更時自動重新載入。')
+    parser.add_argument('--terms', '-t', default=TERMS_FILE, help='術語對照表路徑')
+    parser.add_argument('--host', default=HOST, help='監聽位址')
+    parser.add_argument('--port', '-p', type=int, default=PORT, help='監聽埠號')
+    parser.add_argument('--unix', default=None, help='改以此路徑的 Unix socket 提供服務')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='檢查檔案變更的間隔秒數')
+    args = parser.parse_args()
+
+    service = TermService(args.terms, args.interval)
+    service.start_watcher()
+    server = make_server(service, args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{server.server_address[1]}"
+    logger.info(f"術語轉換服務已啟動：{where}（版本 {service.index.version}，{service.index.n_terms} 個術語）")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+if __name__ == '__main__':
+    main()
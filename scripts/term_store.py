@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+術語資料存放區
+一次載入 terms.csv、wiki_terms_snapshot.csv 與 deleted_terms.txt，並建立索引，
+供爬蟲合併、modify_term 修改與 README 產生共用
+"""
+
+import csv
+import logging
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TERMS_FILE = 'terms.csv'
+WIKI_SNAPSHOT_FILE = 'wiki_terms_snapshot.csv'
+DELETED_TERMS_FILE = 'deleted_terms.txt'
+
+# 合併統計
+MergeStats = namedtuple('MergeStats', ['new', 'updated', 'skipped', 'deleted_skipped'])
+# 修改結果：found 為是否找到詞彙，recorded / already_recorded 為刪除模式下新記錄與已存在的刪除記錄
+EditResult = namedtuple('EditResult', ['found', 'old_tw', 'new_tw', 'recorded', 'already_recorded'])
+
+
+def split_tw(tw):
+    """拆分以分號分隔的台灣用語為 set"""
+    return set(t.strip() for t in tw.split(';') if t.strip())
+
+
+def read_terms_csv(path, label):
+    """讀取 cn,tw 格式的 CSV，回傳 {cn: tw}"""
+    terms = {}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    terms[row['cn']] = row['tw']
+            logger.info(f"載入{label} {len(terms)} 個")
+        except Exception as e:
+            logger.error(f"載入{label}失敗: {e}")
+    return terms
+
+
+@contextmanager
+def atomic_open(path, newline=None):
+    """先寫入同目錄的暫存檔再 rename 取代，寫入中斷時不會留下不完整的檔案"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline=newline) as f:
+            yield f
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_terms_csv(path, terms, sort=True):
+    """寫入 cn,tw 格式的 CSV"""
+    items = sorted(terms.items(), key=lambda x: x[0]) if sort else terms.items()
+    with atomic_open(path, newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['cn', 'tw'])
+        for cn_term, tw_term in items:
+            writer.writerow([cn_term, tw_term])
+
+
+class TermStore:
+    """三個術語檔案的記憶體內表示，每個檔案在一次執行中只解析一次"""
+
+    def __init__(self, terms_file=TERMS_FILE, snapshot_file=WIKI_SNAPSHOT_FILE,
+                 deleted_file=DELETED_TERMS_FILE):
+        self.terms_file = terms_file
+        self.snapshot_file = snapshot_file
+        self.deleted_file = deleted_file
+        self.terms = {}            # cn → tw 原始字串，保留檔案順序
+        self.tw_sets = {}          # cn → 預先拆分的台灣用語 set
+        self.snapshot = {}         # 上次維基教科書快照 cn → tw
+        self.deleted = {}          # 刪除索引 cn → set(tw)
+        self.deleted_records = []  # deleted_terms.txt 的每一行，保留檔案順序
+        self._deleted_record_set = set()
+        self.load()
+
+    def load(self):
+        """載入三個檔案並建立索引"""
+        self.set_terms(read_terms_csv(self.terms_file, '現有術語'))
+        self.snapshot = read_terms_csv(self.snapshot_file, '上次維基快照術語')
+        self.deleted = {}
+        self.deleted_records = []
+        self._deleted_record_set = set()
+        if os.path.exists(self.deleted_file):
+            try:
+                with open(self.deleted_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        self._add_deleted_record(line.strip())
+                logger.info(f"載入本地刪除詞彙 {len(self.deleted)} 筆")
+            except Exception as e:
+                logger.error(f"載入刪除詞彙失敗: {e}")
+        return self
+
+    def set_terms(self, terms):
+        """以新的 {cn: tw} 取代目前的術語並重建拆分索引"""
+        self.terms = dict(terms)
+        self.tw_sets = {cn: split_tw(tw) for cn, tw in self.terms.items()}
+
+    def _set_term(self, cn, tw):
+        self.terms[cn] = tw
+        self.tw_sets[cn] = split_tw(tw)
+
+    def _remove_term(self, cn):
+        self.terms.pop(cn, None)
+        self.tw_sets.pop(cn, None)
+
+    def _add_deleted_record(self, line):
+        """加入一筆刪除記錄，回傳是否為新記錄"""
+        if not line or line in self._deleted_record_set:
+            return False
+        self._deleted_record_set.add(line)
+        self.deleted_records.append(line)
+        if ',' in line:
+            cn, tws = line.split(',', 1)
+            self.deleted.setdefault(cn.strip(), set()).update(split_tw(tws))
+        return True
+
+    def is_deleted(self, cn, tw):
+        """此對應是否曾被本地刪除"""
+        return tw in self.deleted.get(cn, ())
+
+    def merge(self, wiki_terms):
+        """詞彙級合併：僅維基內容有異動的詞才自動合併，且本地刪除內容不會自動加回，只合併新內容
+
+        直接更新 self.terms（不複製，先前取得的 self.terms 參照也會看到合併結果），回傳 (wiki_terms_dict, MergeStats)
+        """
+        # 將 wiki_terms 按中國大陸詞分組；cn 與 tw 數量不同的列會解析為以分號串接的 tw，
+        # 快照比較沿用原始字串，扣除刪除內容則須以拆開後的個別詞進行
+        cn_to_tw_terms = {}
+        cn_to_tw_sets = {}
+        for cn_term, tw_term in wiki_terms:
+            if cn_term not in cn_to_tw_terms:
+                cn_to_tw_terms[cn_term] = set()
+                cn_to_tw_sets[cn_term] = set()
+            cn_to_tw_terms[cn_term].add(tw_term)
+            cn_to_tw_sets[cn_term].update(split_tw(tw_term))
+        wiki_terms_dict = {cn: ';'.join(sorted(tws)) for cn, tws in cn_to_tw_terms.items()}
+
+        merged_terms = self.terms
+        new_terms = 0
+        updated_terms = 0
+        skipped_terms = 0
+        deleted_skipped = 0
+
+        for cn_term, new_tw in wiki_terms_dict.items():
+            prev_tw = self.snapshot.get(cn_term)
+            # 如果這個詞在維基教科書快照和這次維基教科書內容一樣，保留本地內容
+            if prev_tw is not None and prev_tw == new_tw:
+                if cn_term in merged_terms:
+                    skipped_terms += 1
+                    continue  # 保留本地內容
+                # 本地沒有，新增
+                self._set_term(cn_term, new_tw)
+                new_terms += 1
+                logger.debug("新增術語: %s → %s", cn_term, new_tw)
+                continue
+
+            # 維基教科書內容有異動，才自動合併/覆蓋
+            deleted_tw_set = self.deleted.get(cn_term)
+            if deleted_tw_set is not None:
+                # 只合併新內容，不加回刪除內容
+                new_only_set = cn_to_tw_sets[cn_term] - deleted_tw_set
+                if new_only_set:
+                    new_only_str = ';'.join(sorted(new_only_set))
+                    self._set_term(cn_term, new_only_str)
+                    updated_terms += 1
+                    logger.debug("只合併新內容: %s → %s", cn_term, new_only_str)
+                else:
+                    deleted_skipped += 1
+                    logger.debug("本地刪除過，且無新內容: %s，不自動加回", cn_term)
+                continue
+            if cn_term not in merged_terms:
+                self._set_term(cn_term, new_tw)
+                new_terms += 1
+                logger.debug("新增術語: %s → %s", cn_term, new_tw)
+            elif merged_terms[cn_term] != new_tw:
+                old_tw = merged_terms[cn_term]
+                self._set_term(cn_term, new_tw)
+                updated_terms += 1
+                logger.debug("更新術語: %s → %s → %s", cn_term, old_tw, new_tw)
+            else:
+                skipped_terms += 1
+        stats = MergeStats(new_terms, updated_terms, skipped_terms, deleted_skipped)
+        logger.info(f"詞彙級合併：新增 {new_terms}，更新 {updated_terms}，保留本地 {skipped_terms}，本地刪除跳過 {deleted_skipped} 筆")
+        return wiki_terms_dict, stats
+
+    def edit(self, cn_term, new_tw=None, delete_mode=False):
+        """修改或刪除詞彙（僅在記憶體中），刪除模式下記錄被移除的對應，重複執行不會有副作用"""
+        if cn_term not in self.terms:
+            return EditResult(False, None, None, [], [])
+        old_tw = self.terms[cn_term]
+        old_tw_set = self.tw_sets[cn_term]
+        new_tw_set = split_tw(new_tw) if new_tw is not None and new_tw.strip() else set()
+        if new_tw_set:
+            # 只保留新內容
+            result_tw = ';'.join(sorted(new_tw_set))
+            self._set_term(cn_term, result_tw)
+        else:
+            # 整組刪除
+            result_tw = None
+            self._remove_term(cn_term)
+
+        recorded = []
+        already_recorded = []
+        if delete_mode:
+            # 記錄被移除的對應（避免重複）
+            for tw in sorted(old_tw_set - new_tw_set):
+                record = f"{cn_term},{tw}"
+                if self._add_deleted_record(record):
+                    recorded.append(record)
+                else:
+                    already_recorded.append(record)
+        return EditResult(True, old_tw, result_tw, recorded, already_recorded)
+
+    def export_terms(self, path=None, sort=True):
+        """寫出 terms.csv"""
+        write_terms_csv(path or self.terms_file, self.terms, sort=sort)
+
+    def export_snapshot(self, wiki_terms_dict, path=None):
+        """寫出維基快照，並更新記憶體中的快照"""
+        write_terms_csv(path or self.snapshot_file, wiki_terms_dict)
+        self.snapshot = dict(wiki_terms_dict)
+
+    def export_deleted(self, path=None):
+        """寫出 deleted_terms.txt"""
+        with atomic_open(path or self.deleted_file) as f:
+            for record in self.deleted_records:
+                f.write(record + '\n')
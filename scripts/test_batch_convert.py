@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試大量文本平行轉換
+"""
+
+import io
+import json
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.batch_convert import BatchConverter, iter_safe_chunks
+from scripts.term_converter import TermConverter
+
+TERMS = {'会话': '作業階段', '会话层': '會議層', '分布式': '分散式'}
+
+
+def _write_terms(tmpdir):
+    terms_file = os.path.join(tmpdir, 'terms.csv')
+    with open(terms_file, 'w', encoding='utf-8') as f:
+        f.write('cn,tw\n' + ''.join(f'{cn},{tw}\n' for cn, tw in TERMS.items()))
+    return terms_file
+
+
+def test_chunks_never_split_terms():
+    """分段只切在不屬於任何詞的字元之後"""
+    text = '会话层' * 50 + '，分布式' * 50
+    alphabet = set(''.join(TERMS))
+    chunks = list(iter_safe_chunks(io.StringIO(text), alphabet, chunk_size=7))
+    assert ''.join(chunks) == text
+    converter = TermConverter(TERMS)
+    assert ''.join(converter.convert(c) for c in chunks) == converter.convert(text)
+
+
+def test_chunks_bounded_without_safe_cut():
+    """整段都由詞中的字元組成時強制切開，分段長度有上限且轉換結果不變"""
+    converter = TermConverter(TERMS)
+    text = ('会话层' + '分布式会' * 3 + '话') * 500
+    chunks = list(iter_safe_chunks(io.StringIO(text), converter.automaton.alphabet, chunk_size=16,
+                                   automaton=converter.automaton))
+    assert ''.join(chunks) == text
+    assert len(chunks) > 1 and max(len(c) for c in chunks) <= 3 * 16
+    assert ''.join(converter.convert(c) for c in chunks) == converter.convert(text)
+
+
+def test_tree_and_jsonl():
+    """目錄與 JSONL 模式的輸出與單次轉換相同且保持順序"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        terms_file = _write_terms(tmpdir)
+        src = os.path.join(tmpdir, 'src')
+        os.makedirs(os.path.join(src, 'sub'))
+        docs = {'a.md': '会话层\n' * 1000, os.path.join('sub', 'b.md'): '分布式，会话', 'empty.md': ''}
+        for name, content in docs.items():
+            with open(os.path.join(src, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        # 前段可解碼、之後才出現無效位元組的二進位檔，原樣複製
+        image = '会话'.encode('utf-8') * 100 + b'\x89PNG\xff\xfe'
+        with open(os.path.join(src, 'sub', 'image.png'), 'wb') as f:
+            f.write(image)
+
+        batch = BatchConverter(terms_file, jobs=2, chunk_size=64)
+        dst = os.path.join(tmpdir, 'dst')
+        assert batch.convert_tree(src, dst) == 4
+        with open(os.path.join(dst, 'sub', 'image.png'), 'rb') as f:
+            assert f.read() == image
+        converter = TermConverter(TERMS)
+        for name, content in docs.items():
+            with open(os.path.join(dst, name), encoding='utf-8') as f:
+                assert f.read() == converter.convert(content)
+
+        records = [{'id': i, 'text': '会话' * i} for i in range(600)]
+        lines = [json.dumps(r, ensure_ascii=False) + '\n' for r in records]
+        # 不是物件的合法 JSON 原樣輸出
+        lines[1:1] = ['["会话"]\n', '"会话"\n', '42\n']
+        out = io.StringIO()
+        batch.convert_jsonl(io.StringIO(''.join(lines)), out)
+        output = out.getvalue().splitlines(keepends=True)
+        assert output[1:4] == ['["会话"]\n', '"会话"\n', '42\n']
+        result = [json.loads(line) for line in output[:1] + output[4:]]
+        assert [r['id'] for r in result] == list(range(600))
+        assert result[3]['text'] == '作業階段' * 3
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_incremental_tree():
+    """字典更新後只重新轉換用到變更詞或含有新增詞的檔案"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        terms_file = _write_terms(tmpdir)
+        src = os.path.join(tmpdir, 'src')
+        os.makedirs(src)
+        docs = {'a.md': '会话层', 'b.md': '会话', 'c.md': '分布式', 'd.md': '内存', 'e.md': '无关'}
+        for name, content in docs.items():
+            with open(os.path.join(src, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        dst = os.path.join(tmpdir, 'dst')
+        cache_file = os.path.join(dst, '.cache.json')
+
+        def run():
+            return BatchConverter(terms_file, jobs=1).convert_tree(src, dst, cache_file=cache_file)
+
+        def output(name):
+            with open(os.path.join(dst, name), encoding='utf-8') as f:
+                return f.read()
+
+        assert run() == 5
+        assert run() == 0
+
+        # 会话层 的結果不受 会话 影響；新增的 内存 只出現在 d.md
+        with open(terms_file, 'w', encoding='utf-8') as f:
+            f.write('cn,tw\n会话,工作階段\n会话层,會議層\n分布式,分散式\n内存,記憶體\n')
+        assert run() == 2
+        assert output('b.md') == '工作階段' and output('d.md') == '記憶體'
+
+        # 刪除詞與內容變更
+        with open(terms_file, 'w', encoding='utf-8') as f:
+            f.write('cn,tw\n会话,工作階段\n分布式,分散式\n内存,記憶體\n')
+        with open(os.path.join(src, 'e.md'), 'w', encoding='utf-8') as f:
+            f.write('分布式')
+        assert run() == 2
+        assert output('a.md') == '工作階段层' and output('e.md') == '分散式'
+        assert run() == 0
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    test_chunks_never_split_terms()
+    test_chunks_bounded_without_safe_cut()
+    test_tree_and_jsonl()
+    test_incremental_tree()
+    print("✓ 所有測試通過")
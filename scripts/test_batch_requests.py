@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試長文件分段與批次請求
+"""
+
+import sys
+import os
+import io
+import json
+import shutil
+import tempfile
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.batch_requests import BatchRequestBuilder, estimate_tokens, iter_sources, merge_results, split_text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_split_text_budget():
+    """每段都在預算內，串接後與原文相同，且只在段落或句子邊界切開"""
+    text = '第一段介绍内存。\n\n' + '这是一个很长的句子，讨论会话与线程。' * 30 + '\n\nEnd of the manual. Bye.\n'
+    chunks = list(split_text(text, 60))
+    assert ''.join(chunks) == text
+    assert all(estimate_tokens(chunk) <= 60 for chunk in chunks)
+    assert len(chunks) > 2
+    assert all(chunk.endswith(('。', '\n')) for chunk in chunks)
+
+
+def test_requests_merge_in_order():
+    """每段只附上自己用到的術語，結果不論順序都能依原順序合併"""
+    with open(os.path.join(ROOT, 'USAGE.md'), encoding='utf-8') as f:
+        usage = f.read()
+    builder = BatchRequestBuilder(os.path.join(ROOT, 'terms.csv'), model='test-model', max_tokens=400)
+    dst = io.StringIO()
+    count = builder.write([('USAGE.md', usage), ('short.txt', '\n会话\n')], dst)
+    requests = [json.loads(line) for line in dst.getvalue().splitlines()]
+    assert count == len(requests) > 2
+    assert len({r['custom_id'] for r in requests}) == count
+    # 預算包含說明與術語表，不只是文本
+    assert all(estimate_tokens(r['body']['messages'][0]['content']) <= 400 for r in requests)
+
+    short = requests[-1]['body']['messages'][0]['content']
+    assert '- 會話 → ' in short and '- 內存 → ' not in short
+
+    # 以原文當作回應，模擬模型去掉了前後空白
+    results = []
+    for r in reversed(requests):
+        body = r['body']['messages'][0]['content'].split('### 要轉換的文本：\n', 1)[1]
+        results.append(json.dumps({'custom_id': r['custom_id'], 'response': {
+            'status_code': 200, 'body': {'choices': [{'message': {'content': body.strip()}}]}}}))
+    merged = merge_results(builder.manifest(), results)
+    assert merged == {'USAGE.md': usage, 'short.txt': '\n会话\n'}
+
+
+def test_same_name_in_different_directories():
+    """不同目錄中的同名檔案以相對路徑區分，合併時不會互相覆蓋"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for sub, content in (('a', '会话\n'), ('b', '内存\n')):
+            os.makedirs(os.path.join(tmpdir, sub))
+            with open(os.path.join(tmpdir, sub, 'x.md'), 'w', encoding='utf-8') as f:
+                f.write(content)
+        dirs = [os.path.join(tmpdir, 'a'), os.path.join(tmpdir, 'b')]
+        assert [name for name, _ in iter_sources(dirs[:1])] == ['x.md']
+        sources = list(iter_sources(dirs))
+        assert sources == [(os.path.join('a', 'x.md'), '会话\n'), (os.path.join('b', 'x.md'), '内存\n')]
+
+        builder = BatchRequestBuilder(os.path.join(ROOT, 'terms.csv'), model='test-model')
+        dst = io.StringIO()
+        builder.write(sources, dst)
+        results = []
+        for line in dst.getvalue().splitlines():
+            r = json.loads(line)
+            body = r['body']['messages'][0]['content'].split('### 要轉換的文本：\n', 1)[1]
+            results.append(json.dumps({'custom_id': r['custom_id'], 'response': {
+                'status_code': 200, 'body': {'choices': [{'message': {'content': body}}]}}}))
+        assert merge_results(builder.manifest(), results) == dict(sources)
+    finally:
+        shutil.rmtree(tmpdir)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試離線效能基準測試
+"""
+
+import sys
+import os
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.benchmark import BENCHMARKS, compare, run_suite, scaled_terms
+
+
+def test_scaled_terms():
+    """放大後的術語表不重複，且大小為原本的倍數"""
+    base = {'会话': '作業階段;工作階段', '内存': '記憶體'}
+    terms = scaled_terms(300, base)
+    assert len(terms) == 600
+    assert terms['会话'] == '作業階段;工作階段'
+
+
+def test_suite_and_compare():
+    """在 1× 下跑完所有基準，並能偵測退步"""
+    results = run_suite([1], repeat=1)
+    assert set(results['results']) == {f'{name}@1x' for name in BENCHMARKS}
+    assert compare(results, results) == []
+
+    slower = {'results': {key: dict(value, seconds=value['seconds'] * 2 + 1)
+                          for key, value in results['results'].items()}}
+    assert len(compare(slower, results)) == len(BENCHMARKS)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試術語表檢查
+"""
+
+import sys
+import os
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.lint_terms import lint_terms, summarize
+
+
+def test_lint_terms():
+    """重複、自我對應、包含關係、轉換結果再替換與刪除詞彙衝突都應被找出"""
+    rows = [
+        ('下拉菜单', '下拉式功能表;下拉式選單;下拉式選單'),
+        ('不可变的', '不可變的'),
+        ('会话', '作業階段'),
+        ('会话层', '會談層'),
+        ('位', '位元'),
+        ('文本', '文字'),
+        ('文本', '本文'),
+        ('空', ''),
+    ]
+    traditional = {'不可变的': '不可變的', '会话': '會話'}
+    issues = lint_terms(rows, {'文本': {'文字'}},
+                        lambda keys: [traditional.get(key, key) for key in keys])
+    found = {(issue.check, issue.cn) for issue in issues}
+    assert ('duplicate_key', '文本') in found
+    assert ('empty_value', '空') in found
+    assert ('duplicate_alternative', '下拉菜单') in found
+    assert ('self_mapping', '不可变的') in found
+    assert ('nested_key', '会话层') in found
+    assert ('unsafe_target', '位') in found
+    assert ('deleted_conflict', '文本') in found
+    assert ('nested_key', '会话') not in found
+    assert summarize(issues)['duplicate_key'] == 1
+    assert all(issue.severity == 'error' for issue in issues if issue.check == 'deleted_conflict')
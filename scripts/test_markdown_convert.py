@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試 Markdown 感知的術語轉換
+"""
+
+import sys
+import os
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.markdown_convert import MarkdownConverter, iter_regions
+from scripts.term_converter import TermConverter
+
+TERMS = {'会话': '作業階段', '会话层': '會議層', '文档': '文件'}
+
+DOC = '''# 会话层
+
+使用 `会话` 与 <a href="https://x.org/会话">会话</a>，参见 [会话文档](docs/会话.md) 与 <https://x.org/会话>。
+
+```python
+s = "会话"
+```
+
+[文档]: http://x.org/文档
+最后的会话'''
+
+
+def test_only_prose_is_converted():
+    """程式碼、連結目標、網址與 HTML 標籤不轉換，連結文字與內文照常轉換"""
+    converted = MarkdownConverter(TermConverter(TERMS)).convert(DOC)
+    assert converted.startswith('# 會議層\n')
+    assert '`会话`' in converted
+    assert '<a href="https://x.org/会话">作業階段</a>' in converted
+    assert '[作業階段文件](docs/会话.md)' in converted
+    assert '<https://x.org/会话>。' in converted
+    assert 's = "会话"' in converted
+    assert '[文档]: http://x.org/文档' in converted
+    assert converted.endswith('最后的作業階段')
+    kinds = [kind for kind, _, _ in iter_regions(DOC)]
+    assert {'inline_code', 'html', 'link_target', 'url', 'fenced_code'} <= set(kinds)
+
+
+def test_source_map_byte_offsets():
+    """對應表的位元組位置可在原文與輸出的 UTF-8 編碼中取回替換前後的詞"""
+    converted, mappings = MarkdownConverter(TermConverter(TERMS)).convert_with_map(DOC)
+    assert converted == MarkdownConverter(TermConverter(TERMS)).convert(DOC)
+    src, out = DOC.encode('utf-8'), converted.encode('utf-8')
+    assert len(mappings) == 5
+    for m in mappings:
+        assert src[m.src_start:m.src_end].decode('utf-8') == m.source
+        assert out[m.out_start:m.out_end].decode('utf-8') == m.target
+    last = mappings[-1]
+    assert len(src) - last.src_end == len(out) - last.out_end
+
+
+def test_bare_url_ends_at_cjk():
+    """裸網址遇到中日韓文字或全形標點即結束，緊接在後的內文照常轉換"""
+    doc = '详见https://x.org/a了解会话，或https://x.org/b（会话）'
+    converted = MarkdownConverter(TermConverter(TERMS)).convert(doc)
+    assert converted == '详见https://x.org/a了解作業階段，或https://x.org/b（作業階段）'
+    regions = [(kind, doc[start:end]) for kind, start, end in iter_regions(doc)]
+    assert ('url', 'https://x.org/a') in regions and ('url', 'https://x.org/b') in regions
+
+
+def test_angle_bracket_targets_and_comments():
+    """角括號包住的連結目標與 HTML 註解不轉換"""
+    doc = '[会话](<docs/会话 x.md> "会话") <!-- 会话\n会话 --> 会话\n[文档]: <docs/文档 y.md>\n'
+    converted = MarkdownConverter(TermConverter(TERMS)).convert(doc)
+    assert converted == '[作業階段](<docs/会话 x.md> "会话") <!-- 会话\n会话 --> 作業階段\n[文档]: <docs/文档 y.md>\n'
+    kinds = [kind for kind, _, _ in iter_regions(doc)]
+    assert kinds == ['prose', 'link_target', 'prose', 'html', 'prose', 'link_target', 'prose']
+
+
+if __name__ == "__main__":
+    test_only_prose_is_converted()
+    test_source_map_byte_offsets()
+    test_bare_url_ends_at_cjk()
+    test_angle_bracket_targets_and_comments()
+    print("✓ 所有測試通過")
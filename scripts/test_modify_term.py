@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試批次修改與刪除詞彙
+"""
+
+import contextlib
+import io
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.modify_term import DELETED_TERMS_FILE, TERMS_FILE, modify_terms_batch, parse_batch_line
+from scripts.term_store import TermStore
+from scripts.testutil import working_directory
+
+BATCH = '''# 整理清單
+配置 組態;設定
+文本 --delete
+"会话" 工作階段 -d
+
+不存在 某詞
+太 多 參數
+'未結束的引號
+'''
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _run_batch():
+    """以新的 TermStore 套用 BATCH，回傳 (輸出, 各檔案寫入次數)"""
+    store = TermStore(TERMS_FILE, deleted_file=DELETED_TERMS_FILE)
+    writes = {'terms': 0, 'deleted': 0}
+    export_terms, export_deleted = store.export_terms, store.export_deleted
+
+    def counted_terms(*args, **kwargs):
+        writes['terms'] += 1
+        return export_terms(*args, **kwargs)
+
+    def counted_deleted(*args, **kwargs):
+        writes['deleted'] += 1
+        return export_deleted(*args, **kwargs)
+
+    store.export_terms, store.export_deleted = counted_terms, counted_deleted
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        modify_terms_batch(BATCH.splitlines(), store)
+    return out.getvalue(), writes
+
+
+def test_parse_batch_line():
+    """格式與命令列相同，支援引號與 -d / --delete"""
+    assert parse_batch_line('配置 組態;設定') == ('配置', '組態;設定', False)
+    assert parse_batch_line('-d 文本') == ('文本', None, True)
+    assert parse_batch_line('"会 话" 工作階段 --delete') == ('会 话', '工作階段', True)
+    for line in ('-d', '太 多 參數', "'未結束"):
+        try:
+            parse_batch_line(line)
+        except ValueError:
+            continue
+        raise AssertionError(f'應拒絕：{line}')
+
+
+def test_batch_is_idempotent():
+    """批次檔每個檔案只寫一次，略過註解與格式錯誤的行，重複套用不再變更檔案"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with working_directory(tmpdir):
+            with open(TERMS_FILE, 'w', encoding='utf-8') as f:
+                f.write('cn,tw\n会话,作業階段;工作階段\n配置,組態;配置\n文本,文字\n自订,自訂\n')
+            with open(DELETED_TERMS_FILE, 'w', encoding='utf-8') as f:
+                f.write('配置,配置\n')
+
+            out, writes = _run_batch()
+            assert '批次處理完成：修改 2 個，整組刪除 1 個，新增刪除記錄 2 筆，記錄已存在 0 筆' in out
+            assert '第 7 行略過' in out and '第 8 行略過' in out
+            assert '未找到詞彙：不存在' in out
+            assert writes == {'terms': 1, 'deleted': 1}
+            terms, deleted = _read(TERMS_FILE), _read(DELETED_TERMS_FILE)
+            assert terms == 'cn,tw\n会话,工作階段\n配置,組態;設定\n自订,自訂\n'
+            assert deleted == '配置,配置\n文本,文字\n会话,作業階段\n'
+
+            out, writes = _run_batch()
+            assert '批次處理完成：修改 0 個，整組刪除 0 個，新增刪除記錄 0 筆，記錄已存在 0 筆' in out
+            assert '未找到詞彙：文本、不存在' in out
+            assert writes == {'terms': 0, 'deleted': 0}
+            assert _read(TERMS_FILE) == terms
+            assert _read(DELETED_TERMS_FILE) == deleted
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    test_parse_batch_line()
+    test_batch_is_idempotent()
+    print("✓ 所有測試通過")
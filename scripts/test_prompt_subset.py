@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試依輸入內容產生的精簡 prompt
+"""
+
+import sys
+import os
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.prompt_subset import PromptSubsetter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_subset_matches_simplified_and_traditional():
+    """簡體與轉繁體後的寫法都會選入對應的規則，其他規則不會出現"""
+    subsetter = PromptSubsetter([('会话', '作業階段'), ('内存', '記憶體'), ('配置', '組態'), ('线程', '執行緒')])
+    prompt = subsetter.build_prompt('请检查内存和會話')
+    assert '- 會話 → 作業階段' in prompt
+    assert '- 內存 → 記憶體' in prompt
+    assert '組態' not in prompt and '執行緒' not in prompt
+    assert prompt.endswith('### 要轉換的文本：\n请检查内存和會話')
+
+
+def test_full_prompt_matches_readme():
+    """完整模式與 README 中的 prompt 相同"""
+    subsetter = PromptSubsetter.from_csv(os.path.join(ROOT, 'terms.csv'))
+    with open(os.path.join(ROOT, 'README.md'), encoding='utf-8') as f:
+        readme = f.read()
+    assert subsetter.build_prompt('[在此處插入需要轉換的文本]', full=True) in readme
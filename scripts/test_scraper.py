@@ -4,13 +4,101 @@
 測試爬蟲功能
 """
 
+import json
 import sys
 import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # 添加父目錄到路徑
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.scrape_wiki_terms import WikiTermsScraper
+from scripts.scrape_wiki_terms import PARSERS, Source, WikiTermsScraper, load_sources, register_parser
+from scripts.term_history import TermHistory
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+WIKI_FIXTURE = os.path.join(FIXTURE_DIR, 'wiki_terms_page.html')
+
+
+class RecordedPageServer:
+    """在本機提供錄製頁面的替身伺服器，支援 ETag 條件請求"""
+
+    def __init__(self, pages, delay=0):
+        self.pages = pages  # {path: (etag, body bytes)}
+        self.requests = []
+        self.delay = delay  # 每個請求的回應延遲秒數
+        self.active = 0
+        self.max_active = 0  # 同時處理中的請求數最大值
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    time.sleep(server.delay)
+                    self._respond()
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+            def _respond(self):
+                server.requests.append((self.path, self.headers.get('If-None-Match')))
+                etag, body = server.pages.get(self.path.split('?')[0], (None, None))
+                if body is None:
+                    self.send_error(404)
+                    return
+                if etag and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                if etag:
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', 'Tue, 15 Jul 2025 00:00:00 GMT')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _read_fixture():
+    with open(WIKI_FIXTURE, 'rb') as f:
+        return f.read()
+
+
+def _scraper_in(tmpdir, url):
+    scraper = WikiTermsScraper()
+    scraper.url = url
+    scraper.terms_file = os.path.join(tmpdir, 'terms.csv')
+    scraper.wiki_snapshot_file = os.path.join(tmpdir, 'wiki_terms_snapshot.csv')
+    scraper.deleted_terms_file = os.path.join(tmpdir, 'deleted_terms.txt')
+    scraper.wiki_meta_file = os.path.join(tmpdir, 'wiki_terms_snapshot.meta.json')
+    scraper.history_file = os.path.join(tmpdir, 'terms_history.sqlite')
+    return scraper
 
 def test_scraper():
     """測試爬蟲功能"""
@@ -53,5 +141,161 @@ def test_scraper():
     print("\n所有測試通過！爬蟲功能正常。")
     return True
 
+def test_parser_backends():
+    """lxml 串流解析與 BeautifulSoup 解析在錄製頁面上結果相同"""
+    html_content = _read_fixture().decode('utf-8')
+    bs4_terms = WikiTermsScraper(parser='bs4').parse_terms_table(html_content)
+    lxml_terms = WikiTermsScraper(parser='lxml').parse_terms_table(html_content)
+    assert bs4_terms == lxml_terms
+    assert ('访问', '取用;存取') in lxml_terms
+    assert ('数据库', '資料庫') in lxml_terms
+    assert ('宏指令', '巨集') in lxml_terms
+    assert not any(cn == '计算机' for cn, _ in lxml_terms)
+
+    # TemplateStyles 插入的 <style>、<script> 與註解的內容不算文字，之後的文字照常保留
+    html_content = ('<table class="wikitable"><tr><th>英文</th><th>台灣</th><th>大陆</th></tr>'
+                    '<tr><td>memory</td><td>記憶體<style>.mw-parser-output .a{color:red}</style></td>'
+                    '<td>内存<script>var 服务器 = 1;</script>，存储器<!-- 注释 --></td></tr></table>')
+    bs4_terms = WikiTermsScraper(parser='bs4').parse_terms_table(html_content)
+    lxml_terms = WikiTermsScraper(parser='lxml').parse_terms_table(html_content)
+    assert bs4_terms == lxml_terms == [('内存', '記憶體'), ('存储器', '記憶體')]
+
+    # 巢狀表格：外層列排在其中巢狀表格的列之前
+    html_content = ('<table class="wikitable"><tr><th>a</th></tr><tr><td>x</td><td>記憶體</td><td>内存'
+                    '<table class="wikitable"><tr><td>h</td></tr><tr><td>q</td><td>滑鼠</td><td>鼠标</td></tr></table>'
+                    '</td></tr><tr><td>y</td><td>程式</td><td>程序</td></tr></table>')
+    bs4_terms = WikiTermsScraper(parser='bs4').parse_terms_table(html_content)
+    assert WikiTermsScraper(parser='lxml').parse_terms_table(html_content) == bs4_terms
+
+
+def test_load_sources():
+    """來源設定中的解析函式以註冊名稱指定，未知的欄位或名稱會被拒絕"""
+    @register_parser('test-pairs')
+    def parse_pairs(html_content):
+        return [tuple(line.split(',')) for line in html_content.split()]
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, 'sources.json')
+
+        def load(items):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(items, f)
+            return load_sources(path)
+
+        sources = load([{'name': 'wikibooks', 'url': 'https://x.org/a'},
+                        {'name': 'pairs', 'url': 'https://x.org/b', 'parse': 'test-pairs'}])
+        assert sources[0] == Source('wikibooks', 'https://x.org/a')
+        assert sources[1].parse is parse_pairs
+        assert WikiTermsScraper().parse_terms_table('内存,記憶體', sources[1]) == [('内存', '記憶體')]
+
+        for items, message in (([{'name': 'a', 'url': 'u', 'parser': 'test-pairs'}], '未知的欄位'),
+                               ([{'name': 'a', 'url': 'u', 'parse': 'nope'}], '未註冊'),
+                               ([{'name': 'a'}], '缺少欄位'),
+                               ([{'name': 'a', 'url': 'u', 'cn_column': '2'}], '非負整數')):
+            try:
+                load(items)
+            except ValueError as e:
+                assert message in str(e)
+            else:
+                raise AssertionError(f'應拒絕：{items}')
+    finally:
+        PARSERS.pop('test-pairs', None)
+        shutil.rmtree(tmpdir)
+
+
+def test_conditional_fetch():
+    """頁面未變更時（304 或修訂版本相同）略過解析與合併"""
+    body = _read_fixture()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with RecordedPageServer({'/wiki': ('"rev-1"', body), '/plain': (None, body)}) as server:
+            scraper = _scraper_in(tmpdir, server.url('/wiki'))
+            assert scraper.run()
+            assert not scraper.page_unchanged
+            with open(scraper.terms_file, encoding='utf-8') as f:
+                first = f.read()
+            assert '会话层,會議層' in first
+            record = scraper.metrics.to_dict()
+            assert list(record['stages']) == ['fetch', 'parse', 'load', 'merge', 'lint', 'save', 'snapshot']
+            assert record['counters']['lint_errors'] == 0
+            assert record['counters']['bytes_fetched'] == len(body)
+            assert record['counters']['terms_new'] == record['counters']['terms_total'] > 0
+            assert record['success'] and record['counters']['page_unchanged'] == 0
+            assert 'wiki_terms_scraper_stage_seconds{stage="merge"}' in scraper.metrics.to_prometheus()
+
+            # 第二次執行送出 If-None-Match，取得 304 後不再寫入
+            scraper = _scraper_in(tmpdir, server.url('/wiki'))
+            scraper.parse_terms_table = None  # 不應被呼叫
+            assert scraper.run()
+            assert scraper.page_unchanged
+            assert server.requests[-1] == ('/wiki', '"rev-1"')
+
+            # 沒有 ETag 的伺服器改以修訂版本判斷
+            scraper = _scraper_in(tmpdir, server.url('/plain'))
+            assert scraper.run() and not scraper.page_unchanged
+            scraper = _scraper_in(tmpdir, server.url('/plain'))
+            scraper.merge_terms = None  # 不應被呼叫
+            assert scraper.run() and scraper.page_unchanged
+            # 內容相同的兩次寫入只留下一個歷史版本
+            with TermHistory(scraper.history_file) as history:
+                assert len(history.versions(scraper.terms_file)) == 1
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_multiple_sources():
+    """多個來源並行取得並依來源順序合併，同一主機的同時請求數受限"""
+    body = _read_fixture()
+    glossary = ('<html><body><table class="wikitable"><tr><th>中国大陆</th><th>台湾</th></tr>'
+                '<tr><td>鼠标</td><td>滑鼠</td></tr><tr><td>内存</td><td>主記憶體</td></tr>'
+                '</table></body></html>').encode('utf-8')
+    tmpdir = tempfile.mkdtemp()
+    try:
+        # /d 不提供 ETag，只能以修訂版本判斷是否變更
+        pages = {'/a': ('"a"', body), '/b': ('"b"', glossary), '/c': ('"c"', body), '/d': (None, body)}
+        with RecordedPageServer(pages, delay=0.3) as server:
+            def scraper_for_sources():
+                scraper = _scraper_in(tmpdir, server.url('/a'))
+                scraper.sources = [
+                    Source('wikibooks', server.url('/a')),
+                    Source('glossary', server.url('/b'), tw_column=1, cn_column=0),
+                    Source('mirror', server.url('/c')),
+                    Source('plain', server.url('/d')),
+                ]
+                return scraper
+
+            scraper = scraper_for_sources()
+            start = time.perf_counter()
+            assert scraper.run()
+            assert time.perf_counter() - start < 1.1  # 四個請求不是依序進行（依序需 1.2 秒）
+            assert server.max_active == scraper.per_host_limit == 2
+            with open(scraper.terms_file, encoding='utf-8') as f:
+                content = f.read()
+            assert '鼠标,滑鼠' in content
+            assert '内存,主記憶體;記憶體' in content
+
+            # 全部未變更時略過；只有一個來源變更時，其他來源重新完整取得
+            del server.requests[:]
+            assert scraper_for_sources().run()
+            assert all(etag is not None for path, etag in server.requests if path != '/d')
+            pages['/b'] = ('"b2"', glossary.replace('滑鼠'.encode('utf-8'), '滑鼠器'.encode('utf-8')))
+            del server.requests[:]
+            scraper = scraper_for_sources()
+            assert scraper.run() and not scraper.page_unchanged
+            assert [r for r in server.requests if r[0] == '/a'] == [('/a', '"a"'), ('/a', None)]
+            # 修訂版本相同的 200 回應直接沿用，不再重新取得
+            assert [r for r in server.requests if r[0] == '/d'] == [('/d', None)]
+            with open(scraper.terms_file, encoding='utf-8') as f:
+                content = f.read()
+            assert '鼠标,滑鼠器' in content and '会话层,會議層' in content
+    finally:
+        shutil.rmtree(tmpdir)
+
+
 if __name__ == "__main__":
-    test_scraper() 
\ No newline at end of file
+    test_scraper()
+    test_parser_backends()
+    test_load_sources()
+    test_conditional_fetch()
+    test_multiple_sources() 
\ No newline at end of file
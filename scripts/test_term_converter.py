@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試本地術語轉換引擎
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.term_converter import TermConverter, reverse_terms
+from scripts.term_dict import PackedDictionary, build_dictionary, load_dictionary
+
+TERMS = {
+    '会话': '作業階段;工作階段',
+    '会话层': '會議層',
+    '分布': '分散',
+    '分布式': '分散式',
+    '位': '位元',
+    '列表': '列表;清單',
+}
+
+
+def test_longest_match():
+    """最長的詞優先於其前綴"""
+    converter = TermConverter(TERMS)
+    assert converter.convert('会话层与分布式系统') == '會議層与分散式系统'
+    assert converter.convert('会话和分布') == '作業階段和分散'
+
+
+def test_leftmost_match():
+    """重疊時由最左邊的比對優先"""
+    converter = TermConverter({'ab': 'X', 'bcd': 'Y'})
+    assert converter.convert('abcd') == 'Xcd'
+    assert converter.convert('zbcd') == 'zY'
+
+
+def test_spans():
+    """回傳原文與輸出位置，以及所有候選詞"""
+    converter = TermConverter(TERMS)
+    text = '32位列表'
+    converted, matches = converter.convert_with_spans(text)
+    assert converted == '32位元列表'
+    assert [(m.start, m.end, m.source) for m in matches] == [(2, 3, '位'), (3, 5, '列表')]
+    for m in matches:
+        assert converted[m.out_start:m.out_end] == m.target
+    assert matches[1].alternatives == ('列表', '清單')
+
+
+def test_terms_csv():
+    """可直接由 terms.csv 編譯"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    converter = TermConverter.from_csv(os.path.join(root, 'terms.csv'))
+    assert converter.convert('会话层') == '會議層'
+
+
+def test_packed_dictionary():
+    """二進位字典與直接編譯的結果一致，terms.csv 變更後會自動重建"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        terms_file = os.path.join(tmpdir, 'terms.csv')
+        with open(terms_file, 'w', encoding='utf-8') as f:
+            f.write('cn,tw\n' + ''.join(f'{cn},{tw}\n' for cn, tw in TERMS.items()))
+        dict_file = build_dictionary(terms_file)
+        dictionary = PackedDictionary(dict_file)
+        assert len(dictionary) == len(TERMS)
+        assert dictionary.get('会话层') == '會議層'
+        assert '会' not in dictionary
+
+        text = '会话层、会话与分布式列表的32位'
+        packed = TermConverter.from_dictionary(dictionary)
+        assert packed.convert_with_spans(text) == TermConverter(TERMS).convert_with_spans(text)
+
+        with open(terms_file, 'a', encoding='utf-8') as f:
+            f.write('系统,系統\n')
+        reloaded = load_dictionary(terms_file)
+        assert reloaded.version != dictionary.version
+        assert TermConverter.from_dictionary(reloaded).convert('系统') == '系統'
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_reverse():
+    """反向轉換：同一台灣用語對應多個 cn 時，以其為首選的 cn 優先"""
+    terms = {'内建': '內建', '内置': '內建', '配置': '組態;設定', '设置': '設定'}
+    assert reverse_terms(terms) == {'內建': '内建;内置', '組態': '配置', '設定': '设置;配置'}
+    converter = TermConverter(reverse_terms(terms))
+    converted, matches = converter.convert_with_spans('內建設定')
+    assert converted == '内建设置'
+    assert [m.alternatives for m in matches] == [('内建', '内置'), ('设置', '配置')]
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmpdir = tempfile.mkdtemp()
+    try:
+        terms_file = os.path.join(tmpdir, 'terms.csv')
+        shutil.copy(os.path.join(root, 'terms.csv'), terms_file)
+        forward = load_dictionary(terms_file)
+        backward = load_dictionary(terms_file, direction='tw2cn')
+        assert backward.version != forward.version
+        assert TermConverter.from_dictionary(backward).convert('內建') == TermConverter.from_csv(
+            terms_file, 'tw2cn').convert('內建')
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    test_longest_match()
+    test_leftmost_match()
+    test_spans()
+    test_terms_csv()
+    test_packed_dictionary()
+    test_reverse()
+    print("✓ 所有測試通過")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試術語表版本記錄
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.term_history import TermHistory
+
+
+def test_record_diff_restore():
+    """內容未變更時不新增版本，可比較與還原任兩個版本"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        terms_file = os.path.join(tmpdir, 'terms.csv')
+        with open(terms_file, 'w', encoding='utf-8') as f:
+            f.write('cn,tw\n会话,作業階段\n配置,組態\n自订,自訂\n')
+        with TermHistory(os.path.join(tmpdir, 'history.sqlite')) as history:
+            first, added = history.record(terms_file)
+            assert added
+            assert history.record(terms_file) == (first, False)
+
+            with open(terms_file, 'w', encoding='utf-8') as f:
+                f.write('cn,tw\n会话,作業階段;工作階段\n自订,自訂\n内存,記憶體\n')
+            second, added = history.record(terms_file)
+            assert added and second.id != first.id
+
+            diff = history.diff(first.id, second.id)
+            assert diff.added == {'内存': '記憶體'}
+            assert diff.removed == {'配置': '組態'}
+            assert diff.changed == {'会话': ('作業階段', '作業階段;工作階段')}
+
+            history.restore(first.id)
+            with open(terms_file, encoding='utf-8') as f:
+                assert f.read() == 'cn,tw\n会话,作業階段\n配置,組態\n自订,自訂\n'
+            # 還原前的內容與第二版相同，不會重複記錄
+            assert len(history.versions(terms_file)) == 2
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_prune():
+    """保留政策只留下最新的版本，並清除不再被引用的內容"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with TermHistory(os.path.join(tmpdir, 'history.sqlite')) as history:
+            for i in range(5):
+                history.record('terms.csv', f'cn,tw\n词{i},詞{i}\n'.encode('utf-8'))
+            assert history.prune('terms.csv', keep=2) == 3
+            versions = history.versions('terms.csv')
+            assert len(versions) == 2
+            assert history.content(versions[0].id) == 'cn,tw\n词4,詞4\n'.encode('utf-8')
+            assert history.conn.execute('SELECT COUNT(*) FROM blobs').fetchone()[0] == 2
+    finally:
+        shutil.rmtree(tmpdir)
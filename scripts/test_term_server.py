@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試常駐轉換服務
+"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.request import Request, urlopen
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.term_server import TermService, make_server
+from scripts.term_store import write_terms_csv
+
+
+def _post(url, payload):
+    request = Request(url, data=json.dumps(payload).encode('utf-8'),
+                      headers={'Content-Type': 'application/json'})
+    with urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def _get(url):
+    with urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_service_hot_reload():
+    """轉換與 prompt 請求使用記憶體中的索引，terms.csv 變更後自動換成新版本"""
+    tmpdir = tempfile.mkdtemp()
+    terms_file = os.path.join(tmpdir, 'terms.csv')
+    write_terms_csv(terms_file, {'内存': '記憶體', '会话': '作業階段;工作階段', '内置': '內建'})
+    service = TermService(terms_file, interval=0.05)
+    service.start_watcher()
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        first = _post(base + '/convert', {'text': '内存与会话'})
+        assert first['text'] == '記憶體与作業階段'
+        assert _post(base + '/convert', {'text': '內建', 'direction': 'tw2cn'})['text'] == '内置'
+        prompt = _post(base + '/prompt', {'text': '检查内存'})
+        assert prompt['terms'] == 1 and '- 內存 → 記憶體' in prompt['prompt']
+
+        write_terms_csv(terms_file, {'内存': '主記憶體', '会话': '作業階段'})
+        deadline = time.time() + 5
+        while _get(base + '/stats')['version'] == first['version'] and time.time() < deadline:
+            time.sleep(0.05)
+        second = _post(base + '/convert', {'text': '内存与会话'})
+        assert second['version'] != first['version']
+        assert second['text'] == '主記憶體与作業階段'
+
+        # deleted_terms.txt 不影響索引，不會重建或改變版本
+        with open(os.path.join(tmpdir, 'deleted_terms.txt'), 'w', encoding='utf-8') as f:
+            f.write('内存,記憶體\n')
+        assert not service.check_reload()
+
+        stats = _get(base + '/stats')
+        assert stats['reloads'] == 1 and stats['terms'] == 2
+        assert stats['endpoints']['/convert']['count'] == 3
+        assert stats['endpoints']['/prompt']['p99_ms'] >= 0
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.stop()
+        shutil.rmtree(tmpdir)
+
+
+def test_bad_requests_keep_connection_usable():
+    """未知路徑與錯誤的 Content-Length 不會讓連線上的下一個請求錯位，內部錯誤回傳 500 並計入統計"""
+    tmpdir = tempfile.mkdtemp()
+    terms_file = os.path.join(tmpdir, 'terms.csv')
+    write_terms_csv(terms_file, {'内存': '記憶體'})
+    service = TermService(terms_file)
+
+    def fail(payload):
+        raise RuntimeError('boom')
+
+    service.prompt = fail
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conn = HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+
+    def request(path, body, headers):
+        conn.request('POST', path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    try:
+        body = json.dumps({'text': 'POST /convert HTTP/1.1'}).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        assert request('/missing', body, headers)[0] == 404
+        status, result = request('/convert', json.dumps({'text': '内存'}).encode('utf-8'), headers)
+        assert status == 200 and result['text'] == '記憶體'
+
+        status, result = request('/convert', b'', dict(headers, **{'Content-Length': '-1'}))
+        assert status == 400 and 'Content-Length' in result['error']
+
+        status, result = request('/prompt', body, headers)
+        assert status == 500
+        stats = service.describe()['endpoints']
+        assert stats['/prompt'] == dict(stats['/prompt'], count=1, errors=1)
+        assert stats['/convert']['count'] == 2 and stats['/convert']['errors'] == 1
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(tmpdir)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試術語資料存放區
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.term_store import TermStore
+
+
+def _make_store(tmpdir):
+    files = {
+        'terms.csv': 'cn,tw\n会话,作業階段;工作階段\n配置,組態\n自订,自訂\n',
+        'wiki_terms_snapshot.csv': 'cn,tw\n会话,作業階段;工作階段\n配置,組態;配置\n',
+        'deleted_terms.txt': '配置,配置\n',
+    }
+    for name, content in files.items():
+        with open(os.path.join(tmpdir, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+    return TermStore(os.path.join(tmpdir, 'terms.csv'),
+                     os.path.join(tmpdir, 'wiki_terms_snapshot.csv'),
+                     os.path.join(tmpdir, 'deleted_terms.txt'))
+
+
+def test_merge():
+    """只合併維基有異動的詞，且不加回本地刪除的內容"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        store = _make_store(tmpdir)
+        store._set_term('会话', '工作階段')  # 本地修改過
+        wiki_terms = [('会话', '作業階段'), ('会话', '工作階段'), ('配置', '配置'), ('配置', '設定'),
+                      ('内存', '記憶體')]
+        wiki_terms_dict, stats = store.merge(wiki_terms)
+        assert store.terms['会话'] == '工作階段'       # 維基未變更，保留本地內容
+        assert store.terms['配置'] == '設定'           # 只合併新內容
+        assert store.terms['内存'] == '記憶體'
+        assert store.terms['自订'] == '自訂'           # 本地自訂保留
+        assert wiki_terms_dict['配置'] == '設定;配置'
+        assert (stats.new, stats.updated, stats.skipped) == (1, 1, 1)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_merge_split_alternatives():
+    """cn 與 tw 數量不同的列解析為以分號串接的 tw，刪除過的個別詞仍不加回"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        files = {'terms.csv': 'cn,tw\n甲,乙\n', 'wiki_terms_snapshot.csv': 'cn,tw\n', 'deleted_terms.txt': '甲,丙\n'}
+        for name, content in files.items():
+            with open(os.path.join(tmpdir, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        store = TermStore(*(os.path.join(tmpdir, name) for name in files))
+        wiki_terms_dict, stats = store.merge([('甲', '乙;丙')])
+        assert store.terms == {'甲': '乙'}
+        assert wiki_terms_dict == {'甲': '乙;丙'}
+        assert stats.updated == 1 and stats.deleted_skipped == 0
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_edit_is_idempotent():
+    """刪除模式只記錄一次被移除的對應"""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        store = _make_store(tmpdir)
+        result = store.edit('会话', '工作階段', delete_mode=True)
+        assert result.recorded == ['会话,作業階段']
+        assert store.tw_sets['会话'] == {'工作階段'}
+        assert store.is_deleted('会话', '作業階段')
+        store._set_term('会话', '作業階段;工作階段')
+        result = store.edit('会话', '工作階段', delete_mode=True)
+        assert result.recorded == [] and result.already_recorded == ['会话,作業階段']
+        assert not store.edit('不存在', None).found
+
+        store.export_deleted()
+        with open(os.path.join(tmpdir, 'deleted_terms.txt'), encoding='utf-8') as f:
+            assert f.read() == '配置,配置\n会话,作業階段\n'
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    test_merge()
+    test_merge_split_alternatives()
+    test_edit_is_idempotent()
+    print("✓ 所有測試通過")
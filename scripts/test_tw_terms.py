@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試 tw-terms 統一命令列入口
+"""
+
+import sys
+import os
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在乾淨的直譯器中執行，確認 convert 與 edit 不會載入較慢的相依套件
+LAZY_CHECK = """
+import sys
+sys.argv = ['tw-terms', 'convert', '--terms', 'terms.csv', 'README.md']
+import io, contextlib
+from tw_terms import main
+with contextlib.redirect_stdout(io.StringIO()) as out:
+    main()
+assert '記憶體' in out.getvalue()
+import modify_term, scrape_wiki_terms
+heavy = {'requests', 'bs4', 'hanziconv', 'lxml'} & set(sys.modules)
+assert not heavy, heavy
+"""
+
+
+def test_lazy_imports():
+    """convert 子命令與匯入 modify_term、scrape_wiki_terms 都不載入 requests、bs4、HanziConv"""
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, 'scripts'))
+    result = subprocess.run([sys.executable, '-c', LAZY_CHECK], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_usage():
+    """未知的子命令以結束碼 2 結束並列出可用的子命令"""
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'scripts', 'tw_terms.py'), 'nope'],
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert 'convert' in result.stderr and 'lint' in result.stderr
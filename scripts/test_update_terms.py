@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試 README 術語表產生
+"""
+
+import sys
+import os
+
+# 添加父目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hanziconv import HanziConv
+
+from scripts.hanzi_batch import TraditionalConverter
+from scripts.update_terms import EXCLUDE_WORDS, build_terms_block, load_rows, render_lines, splice_block
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _reference(cn):
+    """舊版以佔位符號保護排除詞的轉換方式"""
+    for idx, word in enumerate(EXCLUDE_WORDS):
+        cn = cn.replace(word, f"__EXCLUDE_{idx}__")
+    cn_trad = HanziConv.toTraditional(cn)
+    for idx, word in enumerate(EXCLUDE_WORDS):
+        cn_trad = cn_trad.replace(f"__EXCLUDE_{idx}__", word)
+    return cn_trad
+
+
+def test_batch_matches_hanziconv():
+    """批次轉換與逐列 HanziConv 結果相同"""
+    rows = load_rows(os.path.join(ROOT, 'terms.csv'))
+    converter = TraditionalConverter({word: word for word in EXCLUDE_WORDS})
+    cns = [cn for cn, _ in rows] + ['表格', '发表', '干系', '头发']
+    assert converter.convert_many(cns) == [_reference(cn) for cn in cns]
+    assert TraditionalConverter({'数据库': '資料庫'}).convert('数据库与内存') == '資料庫與內存'
+
+
+def test_incremental_render():
+    """只有變更的列會重新計算"""
+    rows = [('会话', '作業階段'), ('内存', '記憶體')]
+    lines, cache, recomputed = render_lines(rows)
+    assert lines == ['- 會話 → 作業階段', '- 內存 → 記憶體'] and recomputed == 2
+    rows[1] = ('内存', '記憶體;內部儲存')
+    lines, cache, recomputed = render_lines(rows, cache)
+    assert lines[1] == '- 內存 → 記憶體;內部儲存' and recomputed == 1
+
+
+def test_splice_readme():
+    """README 已是最新時替換結果不變"""
+    with open(os.path.join(ROOT, 'README.md'), encoding='utf-8') as f:
+        readme = f.read()
+    lines, _, _ = render_lines(load_rows(os.path.join(ROOT, 'terms.csv')))
+    assert splice_block(readme, build_terms_block(lines)) == readme
+
+
+if __name__ == "__main__":
+    test_batch_matches_hanziconv()
+    test_incremental_render()
+    test_splice_readme()
+    print("✓ 所有測試通過")
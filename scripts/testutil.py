@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試與基準測試共用的輔助工具
+"""
+
+import contextlib
+import os
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    """暫時切換工作目錄，供以相對路徑讀寫 terms.csv 等檔案的腳本使用"""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
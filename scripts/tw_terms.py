@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tw-terms 統一命令列入口
+子命令在執行時才匯入對應的模組，requests、BeautifulSoup、HanziConv 等較慢的相依套件只在需要的子命令載入，
+convert 與 edit 可在編輯器與 git hook 中頻繁呼叫
+"""
+
+import importlib
+import os
+import sys
+
+# 子命令 → (模組, 函式, 說明)；該函式自行以 argparse 解析其餘參數
+COMMANDS = {
+    'scrape': ('scrape_wiki_terms', 'main', '從維基教科書取得並合併術語對照表'),
+    'merge': ('scrape_wiki_terms', 'merge_main', '以已下載的頁面合併術語對照表，不需連網'),
+    'edit': ('modify_term', 'main', '修改或刪除 terms.csv 的對應內容'),
+    'render': ('update_terms', 'main', '以 terms.csv 更新 README 中的轉換 prompt'),
+    'convert': ('term_converter', 'main', '以 terms.csv 轉換中國大陸技術術語'),
+    'lint': ('lint_terms', 'main', '檢查術語表中的重複、重疊與衝突'),
+}
+
+
+def usage():
+    lines = ['用法：tw-terms <子命令> [參數...]', '', '子命令：']
+    lines += [f'  {name:<10}{help_text}' for name, (_, _, help_text) in COMMANDS.items()]
+    lines += ['', '各子命令的參數請見 tw-terms <子命令> --help']
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """主函式"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    name = argv[0]
+    if name not in COMMANDS:
+        print(f'未知的子命令：{name}\n\n{usage()}', file=sys.stderr)
+        sys.exit(2)
+    module_name, function_name, _ = COMMANDS[name]
+    # 各腳本以同目錄匯入彼此，從其他位置呼叫時也要找得到
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+    sys.argv = [f'tw-terms {name}'] + argv[1:]
+    function = getattr(importlib.import_module(module_name), function_name)
+    function()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,53 +1,176 @@
+import argparse
 import csv
-import re
-from hanziconv import HanziConv
+import json
+import os
+from importlib import metadata
 
 # 要排除的字詞，可擴充
 EXCLUDE_WORDS = ["表"]
 
-# 讀取 CSV
-terms = []
-with open('terms.csv', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        cn = row['cn']
-        # 1. 替換排除詞為特殊標記
-        for idx, word in enumerate(EXCLUDE_WORDS):
-            cn = cn.replace(word, f"__EXCLUDE_{idx}__")
-        # 2. 轉繁體
-        cn_trad = HanziConv.toTraditional(cn)
-        # 3. 還原特殊標記
-        for idx, word in enumerate(EXCLUDE_WORDS):
-            cn_trad = cn_trad.replace(f"__EXCLUDE_{idx}__", word)
-        terms.append(f"- {cn_trad} → {row['tw']}")
-
-# 讀取 README
-with open('README.md', encoding='utf-8') as f:
-    readme = f.read()
-
-# 定位區塊
-pattern = re.compile(
-    r'(請將以下文本中的技術術語進行轉換。轉換規則如下：)([\s\S]*?)(\[在此處插入需要轉換的文本\])',
-    re.MULTILINE
-)
-
-# 生成新區塊，補上所有標題和說明
-terms_block = (
-    '\n### 中國大陸簡體 → 台灣繁體術語對照表：\n'
-    + '\n'.join(terms) + '\n\n'
-    + '### 轉換指示：\n'
-    + '1. 請將文本中出現的中國大陸術語轉換為對應的台灣術語\n'
-    + '2. 保持其他內容不變\n'
-    + '3. 注意上下文，選擇最合適的轉換詞彙\n'
-    + '4. 如果同一個中國大陸術語有多個台灣對應詞彙，請根據上下文選擇最合適的\n\n'
-    + '### 要轉換的文本：\n'
-)
-
-# 替換
-new_readme, count = pattern.subn(r'\1' + terms_block + r'\3', readme)
-if count == 0:
-    raise RuntimeError('未找到術語表區塊，請確認 README 格式')
-
-# 寫回 README
-with open('README.md', 'w', encoding='utf-8') as f:
-    f.write(new_readme)
\ No newline at end of file
+TERMS_FILE = 'terms.csv'
+README_FILE = 'README.md'
+CACHE_FILE = '.readme_terms_cache.json'
+
+# README 中術語表區塊的起訖標記
+BLOCK_START = '請將以下文本中的技術術語進行轉換。轉換規則如下：'
+BLOCK_END = '[在此處插入需要轉換的文本]'
+
+
+def converter_version():
+    """轉換結果的版本：HanziConv 版本加上排除詞，任一變更時快取即失效"""
+    try:
+        hanziconv_version = metadata.version('hanziconv')
+    except metadata.PackageNotFoundError:
+        hanziconv_version = 'unknown'
+    return f"hanziconv-{hanziconv_version}|exclude={','.join(EXCLUDE_WORDS)}"
+
+
+_traditional_converter = None
+
+
+def traditional_converter():
+    """延遲建立批次轉繁體的轉換器，EXCLUDE_WORDS 以詞組覆寫保持不變"""
+    global _traditional_converter
+    if _traditional_converter is None:
+        from hanzi_batch import TraditionalConverter
+        _traditional_converter = TraditionalConverter({word: word for word in EXCLUDE_WORDS})
+    return _traditional_converter
+
+
+def to_traditional(cn):
+    """轉繁體，EXCLUDE_WORDS 中的字詞保持不變"""
+    return traditional_converter().convert(cn)
+
+
+def load_rows(terms_file=TERMS_FILE):
+    """讀取 CSV，回傳 [(cn, tw), ...]"""
+    with open(terms_file, encoding='utf-8') as f:
+        return [(row['cn'], row['tw']) for row in csv.DictReader(f)]
+
+
+def load_cache(cache_file=CACHE_FILE):
+    """讀取上次產生的結果；版本不符或檔案損壞時視為空快取"""
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') == converter_version():
+                return cache.get('lines', {})
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def save_cache(lines, cache_file=CACHE_FILE):
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': converter_version(), 'lines': lines}, f, ensure_ascii=False)
+
+
+def render_line(cn_trad, tw):
+    """術語表中的一行"""
+    return f"- {cn_trad} → {tw}"
+
+
+def render_lines(rows, cache=None):
+    """產生術語表每一行；cache 以 cn 與 tw 為鍵，只有新增或變更的列才重新轉繁體
+
+    回傳 (lines, new_cache, recomputed)
+    """
+    cache = cache or {}
+    keys = [f"{cn}\t{tw}" for cn, tw in rows]
+    misses = [i for i, key in enumerate(keys) if key not in cache]
+    new_cache = {key: cache[key] for key in keys if key in cache}
+    if misses:
+        # 所有需要重算的 cn 一次批次轉繁體
+        converted = traditional_converter().convert_many(rows[i][0] for i in misses)
+        for i, cn_trad in zip(misses, converted):
+            new_cache[keys[i]] = render_line(cn_trad, rows[i][1])
+    lines = [new_cache[key] for key in keys]
+    return lines, new_cache, len(misses)
+
+
+def build_terms_block(lines):
+    """生成新區塊，補上所有標題和說明"""
+    return (
+        '\n### 中國大陸簡體 → 台灣繁體術語對照表：\n'
+        + '\n'.join(lines) + '\n\n'
+        + '### 轉換指示：\n'
+        + '1. 請將文本中出現的中國大陸術語轉換為對應的台灣術語\n'
+        + '2. 保持其他內容不變\n'
+        + '3. 注意上下文，選擇最合適的轉換詞彙\n'
+        + '4. 如果同一個中國大陸術語有多個台灣對應詞彙，請根據上下文選擇最合適的\n\n'
+        + '### 要轉換的文本：\n'
+    )
+
+
+def splice_block(readme, block):
+    """以單次線性掃描將每個起訖標記之間的內容替換為 block"""
+    pieces = []
+    pos = 0
+    count = 0
+    while True:
+        start = readme.find(BLOCK_START, pos)
+        if start < 0:
+            break
+        start += len(BLOCK_START)
+        end = readme.find(BLOCK_END, start)
+        if end < 0:
+            break
+        pieces.append(readme[pos:start])
+        pieces.append(block)
+        pos = end
+        count += 1
+    if count == 0:
+        raise RuntimeError('未找到術語表區塊，請確認 README 格式')
+    pieces.append(readme[pos:])
+    return ''.join(pieces)
+
+
+def update_readme(terms_file=TERMS_FILE, readme_file=README_FILE, cache_file=None, store=None):
+    """更新 README 中的術語表，回傳 README 是否有變更；指定 cache_file 時只重算變更的列
+
+    傳入已載入的 TermStore 時直接使用其中的術語，不再重新讀取 CSV
+    """
+    rows = list(store.terms.items()) if store is not None else load_rows(terms_file)
+    cache = load_cache(cache_file) if cache_file else None
+    lines, new_cache, recomputed = render_lines(rows, cache)
+
+    # 讀取 README
+    with open(readme_file, encoding='utf-8') as f:
+        readme = f.read()
+
+    new_readme = splice_block(readme, build_terms_block(lines))
+    if cache_file:
+        save_cache(new_cache, cache_file)
+    print(f"共 {len(rows)} 個術語，重新轉換 {recomputed} 個")
+    if new_readme == readme:
+        print("術語表無變更，README 不需更新")
+        return False
+
+    # 寫回 README
+    with open(readme_file, 'w', encoding='utf-8') as f:
+        f.write(new_readme)
+    print(f"已更新 {readme_file}")
+    return True
+
+
+def main():
+    """主函式"""
+    parser = argparse.ArgumentParser(description='以 terms.csv 更新 README 中的轉換 prompt。')
+    parser.add_argument('--terms', default=TERMS_FILE, help='術語對照表路徑')
+    parser.add_argument('--readme', default=README_FILE, help='README 路徑')
+    parser.add_argument('--incremental', action='store_true', help=f'增量模式：以 {CACHE_FILE} 快取上次結果，只重算變更的列')
+    parser.add_argument('--cache', default=CACHE_FILE, help='增量模式的快取檔路徑')
+    args = parser.parse_args()
+
+    changed = update_readme(args.terms, args.readme, args.cache if args.incremental else None)
+
+    # 提供給 GitHub Actions 判斷是否需要繳交
+    github_output = os.environ.get('GITHUB_OUTPUT')
+    if github_output:
+        with open(github_output, 'a', encoding='utf-8') as f:
+            f.write(f"changed={'true' if changed else 'false'}\n")
+
+
+if __name__ == '__main__':
+    main()